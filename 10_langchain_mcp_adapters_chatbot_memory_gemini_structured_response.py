@@ -4,6 +4,10 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.checkpoint.memory import InMemorySaver
+from record_replay import recording_callbacks
+from tracing import tracing_callbacks, traced_checkpointer
+from stream_renderer import render_stream
+from tool_selector import ToolSelector
 from pydantic import BaseModel
 
 
@@ -50,16 +54,22 @@ async def run_agent():
     
     llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", include_thoughts=True)
     tools = await client.get_tools()
+    # TOOL_SELECTION=1 binds only the tools relevant to each turn (TOOL_TOP_K, default 8)
+    model = llm
+    if os.getenv("TOOL_SELECTION") == "1":
+        model = ToolSelector(llm, tools, k=int(os.getenv("TOOL_TOP_K", "8")))
     agent = create_react_agent(
-        llm, 
+        model, 
         tools, 
-        checkpointer=InMemorySaver(),
+        checkpointer=traced_checkpointer(InMemorySaver()),
         response_format=Message,
         prompt="You are a helpful assistant. Please respond in the specified format." 
     )
 
     
-    config = {"configurable": {"thread_id": "1"}}
+    # CASSETTE_PATH=<file> records LLM and tool calls for offline replay,
+    # TRACE_DIR=<dir> writes per-node/tool/checkpoint traces
+    config = {"configurable": {"thread_id": "1"}, "callbacks": recording_callbacks() + tracing_callbacks()}
 
     print("Type 'exit' to quit.")
     while True:
@@ -68,33 +78,17 @@ async def run_agent():
             break
         input_message = {"role": "user", "content": user_input}
         
-        async for response in agent.astream(
-            {"messages": [input_message]},
-            stream_mode="values",
-            config=config
-        ):  
+        structured_response = await render_stream(agent, {"messages": [input_message]}, config)
+        if structured_response is not None:
             print("-------------------")
-            print(response)
+            print(structured_response.role)
+            print("-------------------")
+            print(structured_response.content)
+            print("-------------------")
+            print(structured_response.thinking)
+            print("-------------------")
+            print(structured_response.final_response)
             print("-------------------")
-            if 'structured_response' in response:
-                print(response['structured_response'].role)
-                print("-------------------")
-                print(response['structured_response'].content)
-                print("-------------------")
-                print(response['structured_response'].thinking)
-                print("-------------------")
-                print(response['structured_response'].final_response)
-                print("-------------------")
-            # resp = response["messages"][-1]
-            # if hasattr(resp, "content") and isinstance(resp.content, list):
-            #     for item in resp.content:
-            #         if isinstance(item, dict) and item.get("type") == "thinking":
-            #             print("Thinking:", item["thinking"])
-            #         elif isinstance(item, str):
-            #             print("Final Response:", item)
-            # else:
-            #     print(resp)
-        
 
 
 
@@ -1,10 +1,14 @@
 from dotenv import load_dotenv
 import os
 import asyncio
-from langchain_mcp_adapters.client import MultiServerMCPClient
+from mcp_pool import PooledMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.checkpoint.memory import InMemorySaver
+from record_replay import recording_callbacks
+from tracing import tracing_callbacks, traced_checkpointer
+from stream_renderer import render_stream
+from tool_prefetch import SpeculativeToolPrefetcher
 from pydantic import BaseModel
 
 
@@ -13,57 +17,63 @@ from pydantic import BaseModel
 load_dotenv()
 
 async def run_agent():
-    client = MultiServerMCPClient(
+    # Long-lived pooled sessions instead of a new MCP session per tool call
+    client = PooledMCPClient(
         {
             "elasticsearch-mcp-server": {
                 "url": "http://localhost:8089/mcp",
-                "transport": "streamable_http" # stream-http, server-sent-events, stdio
+                "transport": "streamable_http", # stream-http, server-sent-events, stdio
+                "pool_size": 2,
+                "max_concurrency": 8, # tool calls in flight to this server
+                "timeout": 30 # seconds per tool call
             }
         }
     )
     
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite")
-    tools = await client.get_tools()
-    agent = create_react_agent(
-        llm, 
-        tools, 
-        checkpointer=InMemorySaver(),
-        prompt="You are a helpful assistant." 
-    )
+    async with client:
+        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite")
+        # TOOL_PREFETCH=1 starts predictable log searches while the first LLM call runs
+        prefetcher = None
+        if os.getenv("TOOL_PREFETCH") == "1":
+            prefetcher = SpeculativeToolPrefetcher(
+                client.servers["elasticsearch-mcp-server"],
+                index=os.getenv("ES_LOG_INDEX", "logs-*"),
+            )
+            tools = await prefetcher.get_tools()
+        else:
+            tools = await client.get_tools()
+        agent = create_react_agent(
+            llm, 
+            tools, 
+            checkpointer=traced_checkpointer(InMemorySaver()),
+            prompt="You are a helpful assistant." 
+        )
 
     
-    config = {"configurable": {"thread_id": "1"}}
+        # CASSETTE_PATH=<file> records LLM and tool calls for offline replay,
+        # TRACE_DIR=<dir> writes per-node/tool/checkpoint traces
+        config = {"configurable": {"thread_id": "1"}, "callbacks": recording_callbacks() + tracing_callbacks()}
 
-    print("Type 'exit' to quit.")
-    while True:
-        user_input = input("User: ").strip()
-        
-        # skip if empty
-        if not user_input:
-            continue
+        print("Type 'exit' to quit.")
+        while True:
+            user_input = input("User: ").strip()
         
-        if user_input.lower() == "exit":
-            break
+            # skip if empty
+            if not user_input:
+                continue
         
-        input_message = {"role": "user", "content": user_input}
+            if user_input.lower() == "exit":
+                if prefetcher:
+                    print("Prefetch:", prefetcher.stats())
+                break
         
-        async for response in agent.astream(
-            {"messages": [input_message]},
-            stream_mode="values",
-            config=config
-        ):  
-
-            print("-------------------")
-            resp = response["messages"][-1]
-            if hasattr(resp, "content") and isinstance(resp.content, list):
-                for item in resp.content:
-                    if isinstance(item, dict) and item.get("type") == "thinking":
-                        print("Thinking:", item["thinking"])
-                    elif isinstance(item, str):
-                        print("Final Response:", item)
-            else:
-                print(resp)
+            input_message = {"role": "user", "content": user_input}
         
+            if prefetcher:
+                prefetcher.start_turn(user_input)
+            await render_stream(agent, {"messages": [input_message]}, config)
+            if prefetcher:
+                prefetcher.end_turn()
 
 
 
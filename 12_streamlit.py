@@ -8,6 +8,8 @@ Features:
 - Production-ready configuration
 - Chat history management (ChatGPT-style)
 - Session persistence
+- Windowed chat history rendering for long conversations
+- Shared generation scheduler (fair queuing, cancellation of superseded replies)
 """
 
 import os
@@ -21,7 +23,9 @@ from dotenv import load_dotenv
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt import create_react_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
+from generation_scheduler import GenerationScheduler
+from tracing import tracing_callbacks, traced_checkpointer, export_traces
 
 # Load environment variables
 load_dotenv()
@@ -34,6 +38,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Number of most recent messages drawn on each rerun, older ones are loaded on demand
+HISTORY_PAGE_SIZE = 50
+
 # Custom CSS for better UI
 st.markdown("""
 <style>
@@ -57,27 +64,52 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_shared_llm() -> ChatGoogleGenerativeAI:
+    """
+    One Gemini client per process, shared by all sessions
+    
+    Building it per session meant every new session opened fresh connections
+    to the API and paid the connection setup on its first request.
+    """
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash-exp",
+        temperature=0.7,
+        max_tokens=2048
+    )
+
+@st.cache_resource
+def get_scheduler() -> GenerationScheduler:
+    """
+    One generation scheduler per process, shared by all sessions
+    
+    MAX_CONCURRENT_GENERATIONS caps how many replies are generated at once.
+    """
+    return GenerationScheduler(max_concurrent=int(os.getenv("MAX_CONCURRENT_GENERATIONS", "4")))
+
 def initialize_session_state():
     """Initialize all session state variables with proper defaults"""
     if "messages" not in st.session_state:
         st.session_state.messages = []
     
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    
     if "chat_sessions" not in st.session_state:
         st.session_state.chat_sessions = {}
     
     if "current_chat_id" not in st.session_state:
         st.session_state.current_chat_id = None
     
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = HISTORY_PAGE_SIZE
+    
     if "checkpointer" not in st.session_state:
-        st.session_state.checkpointer = InMemorySaver()
+        st.session_state.checkpointer = traced_checkpointer(InMemorySaver())
     
     if "llm" not in st.session_state:
         try:
-            st.session_state.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash-exp",
-                temperature=0.7,
-                max_tokens=2048
-            )
+            st.session_state.llm = get_shared_llm()
         except Exception as e:
             st.error(f"Failed to initialize LLM: {str(e)}")
             st.stop()
@@ -98,9 +130,31 @@ def initialize_session_state():
             st.error(f"Failed to create agent: {str(e)}")
             st.stop()
 
+def show_older_messages():
+    """Extend the history window by one page"""
+    st.session_state.history_window += HISTORY_PAGE_SIZE
+
+@st.fragment
 def display_chat_history():
-    """Display the chat history with proper formatting"""
-    for role, message in st.session_state.messages:
+    """
+    Display the most recent part of the chat history
+    
+    Only the last `history_window` messages are drawn, so rerun time stays flat
+    as the chat grows. Runs as a fragment: loading older messages reruns just
+    this function instead of the whole app.
+    """
+    messages = st.session_state.messages
+    hidden = max(0, len(messages) - st.session_state.history_window)
+    
+    if hidden:
+        st.button(
+            f"⬆️ Load older messages ({hidden} hidden)",
+            key="load_older_messages",
+            on_click=show_older_messages,
+            use_container_width=True
+        )
+    
+    for role, message in messages[hidden:]:
         with st.chat_message(role):
             st.markdown(message)
 
@@ -115,32 +169,44 @@ def stream_agent_response(user_input: str) -> str:
         The complete assistant response
     """
     assistant_response = ""
+    agent = st.session_state.agent
+    # TRACE_DIR=<dir> enables per-node/LLM/checkpoint tracing
+    config = {**st.session_state.config, "callbacks": tracing_callbacks()}
+    
+    async def generate():
+        async for chunk, metadata in agent.astream(
+            {"messages": [HumanMessage(content=user_input)]},
+            config,
+            stream_mode="messages"
+        ):
+            if metadata.get("langgraph_node") == "agent" and isinstance(chunk, (AIMessage, AIMessageChunk)):
+                text = chunk.text()
+                if text:
+                    yield text
+    
+    # A new prompt from this session cancels the previous one if still running
+    generation = get_scheduler().submit(st.session_state.session_id, generate)
     
     try:
         with st.chat_message("assistant"):
             # Create placeholder for streaming response
             message_placeholder = st.empty()
             
-            # Add loading indicator
-            with message_placeholder.container():
-                st.markdown("🤖 Thinking...")
-                time.sleep(0.5)  # Brief pause for UX
+            def show_waiting(generation):
+                # Also gives Streamlit a chance to stop this run on rerun/switch/reload
+                if assistant_response:
+                    return
+                if generation.state == "queued":
+                    message_placeholder.markdown(f"⏳ Waiting for a free slot ({get_scheduler().queued} queued)...")
+                else:
+                    message_placeholder.markdown("🤖 Thinking...")
+            
+            show_waiting(generation)
             
             # Stream the response
-            for event in st.session_state.agent.stream(
-                {"messages": [HumanMessage(content=user_input)]}, 
-                st.session_state.config
-            ):
-                for node_name, node_output in event.items():
-                    if isinstance(node_output, dict) and "messages" in node_output:
-                        # Get the latest message content
-                        messages = node_output["messages"]
-                        if messages and hasattr(messages[-1], 'content'):
-                            new_text = messages[-1].content
-                            if new_text and new_text != assistant_response:
-                                # Only update if we have new content
-                                assistant_response = new_text
-                                message_placeholder.markdown(assistant_response)
+            for text in generation.stream(on_wait=show_waiting):
+                assistant_response += text
+                message_placeholder.markdown(assistant_response)
             
             # If no streaming content was received, show a fallback
             if not assistant_response:
@@ -152,6 +218,9 @@ def stream_agent_response(user_input: str) -> str:
         assistant_response = "I encountered an error while processing your request. Please try again."
         with st.chat_message("assistant"):
             st.markdown(assistant_response)
+    finally:
+        # Streamlit stops this run on rerun, chat switch or reload: drop the generation too
+        generation.cancel()
     
     return assistant_response
 
@@ -168,6 +237,7 @@ def create_new_chat():
     # Create new session
     st.session_state.current_chat_id = new_chat_id
     st.session_state.messages = []
+    st.session_state.history_window = HISTORY_PAGE_SIZE
     st.session_state.config = {"configurable": {"thread_id": new_chat_id}}
     
     # Add to chat sessions
@@ -201,6 +271,7 @@ def load_chat_session(chat_id: str):
         session = st.session_state.chat_sessions[chat_id]
         st.session_state.current_chat_id = chat_id
         st.session_state.messages = session["messages"].copy()
+        st.session_state.history_window = HISTORY_PAGE_SIZE
         st.session_state.config = {"configurable": {"thread_id": chat_id}}
         st.rerun()
 
@@ -225,6 +296,7 @@ def rename_chat_session(chat_id: str, new_title: str):
 def clear_chat_history():
     """Clear the chat history and reset the conversation"""
     st.session_state.messages = []
+    st.session_state.history_window = HISTORY_PAGE_SIZE
     st.session_state.config = {"configurable": {"thread_id": f"thread_{int(time.time())}"}}
     st.rerun()
 
@@ -297,6 +369,17 @@ def main():
         st.markdown("### Model Info")
         st.info("Using Gemini 2.0 Flash")
         
+        stats = get_scheduler().stats()
+        st.markdown("### Scheduler")
+        st.caption(
+            f"Running: {stats['running']} · Queued: {stats['queued']} · "
+            f"Cancelled: {stats['cancelled']}"
+        )
+        st.caption(
+            f"Queue wait p50/p95: {stats['queue_wait_p50_ms']:.0f}/{stats['queue_wait_p95_ms']:.0f} ms · "
+            f"Wasted tokens: ~{stats['wasted_tokens']}"
+        )
+        
         st.markdown("---")
         st.markdown("### Instructions")
         st.markdown("""
@@ -336,6 +419,9 @@ def main():
         
         # Auto-save the chat after each interaction
         save_current_chat()
+        
+        # Write the traces collected so far (no-op unless TRACE_DIR is set)
+        export_traces()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
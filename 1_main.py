@@ -1,9 +1,10 @@
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
+from llm_clients import openai_client
 
 load_dotenv()
-llm = OpenAI(
+# OpenAI client on the shared keep-alive pool (see llm_clients.py)
+llm = openai_client(
     base_url="https://router.huggingface.co/v1",
     api_key=os.environ["HUGGINGFACEHUB_API_TOKEN"],
 )
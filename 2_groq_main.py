@@ -1,10 +1,15 @@
 import os
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
+from llm_clients import groq_chat_model
+from model_cascade import groq_cascade
 
 load_dotenv()
 
 
-model = init_chat_model("llama-3.3-70b-versatile", model_provider="groq")
+# MODEL_CASCADE=1 sends easy prompts to a small model, escalating to the 70b when needed
+if os.getenv("MODEL_CASCADE") == "1":
+   model = groq_cascade()
+else:
+   model = groq_chat_model("llama-3.3-70b-versatile")
 response = model.invoke("who is modi")
 print(response.content)
\ No newline at end of file
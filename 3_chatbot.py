@@ -1,16 +1,22 @@
 import os
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
+from llm_clients import groq_chat_model
+from model_cascade import groq_cascade
 from typing import Annotated
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
+from fanout_graph import build_fanout_graph
 
 
 load_dotenv()
 
 # initialize the LLM
-llm = init_chat_model("llama-3.3-70b-versatile", model_provider="groq")
+# MODEL_CASCADE=1 sends easy prompts to a small model, escalating to the 70b when needed
+if os.getenv("MODEL_CASCADE") == "1":
+   llm = groq_cascade()
+else:
+   llm = groq_chat_model("llama-3.3-70b-versatile")
 
 # graph state definition
 class State(TypedDict):
@@ -34,6 +40,10 @@ graph_builder.add_edge("chatbot", END)
 # compile the graph
 graph = graph_builder.compile()
 
+# CHAT_FANOUT=1 splits multi-part questions and answers the parts in parallel branches
+if os.getenv("CHAT_FANOUT") == "1":
+   graph = build_fanout_graph(llm, max_workers=int(os.getenv("FANOUT_WORKERS", "4")))
+
 
 
 # # save the graph as a png file
@@ -52,7 +62,9 @@ graph = graph_builder.compile()
 def stream_graph_updates(user_input: str):
    for event in graph.stream({"messages": [{"role": "user", "content": user_input}]}):
        for value in event.values():
-           print("Assistant:", value["messages"][-1].content)
+           # fan-out split/answer nodes write no messages
+           if value and "messages" in value:
+               print("Assistant:", value["messages"][-1].content)
 
 
 
@@ -1,15 +1,32 @@
+import os
 from dotenv import load_dotenv
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt import create_react_agent
+from retrieval_memory import RetrievalMemory
+from llm_clients import groq_chat_model
+from model_cascade import groq_cascade
 
 load_dotenv()
 
 checkpointer = InMemorySaver()
 
+# MEMORY_MODE=retrieval sends only the top-k relevant earlier messages plus a
+# recent window to the model, instead of the whole thread
+pre_model_hook = None
+if os.getenv("MEMORY_MODE") == "retrieval":
+   pre_model_hook = RetrievalMemory(
+      top_k=int(os.getenv("MEMORY_TOP_K", "4")),
+      window=int(os.getenv("MEMORY_WINDOW", "6")),
+   )
+
+# MODEL_CASCADE=1 sends easy prompts to a small model, escalating to the 70b when needed
+model = groq_cascade() if os.getenv("MODEL_CASCADE") == "1" else groq_chat_model("llama-3.3-70b-versatile")
+
 agent = create_react_agent(
-   model="groq:llama-3.3-70b-versatile", 
+   model=model, 
    tools=[], 
    checkpointer=checkpointer,
+   pre_model_hook=pre_model_hook,
    prompt="You are a helpful assistant" 
 )
 
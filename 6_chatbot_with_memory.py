@@ -1,20 +1,35 @@
+import os
 from dotenv import load_dotenv
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt import create_react_agent
+from llm_clients import groq_chat_model
+from retrieval_memory import RetrievalMemory
+from record_replay import recording_callbacks
 
 load_dotenv()
 
 checkpointer = InMemorySaver()
 
+# MEMORY_MODE=retrieval sends only the top-k relevant earlier messages plus a
+# recent window to the model, instead of the whole thread
+pre_model_hook = None
+if os.getenv("MEMORY_MODE") == "retrieval":
+   pre_model_hook = RetrievalMemory(
+      top_k=int(os.getenv("MEMORY_TOP_K", "4")),
+      window=int(os.getenv("MEMORY_WINDOW", "6")),
+   )
+
 agent = create_react_agent(
-   model="groq:llama-3.3-70b-versatile", 
+   model=groq_chat_model("llama-3.3-70b-versatile"), 
    tools=[], 
    checkpointer=checkpointer,
+   pre_model_hook=pre_model_hook,
    prompt="You are a helpful assistant" 
 )
 
 
-config = {"configurable": {"thread_id": "1"}}
+# CASSETTE_PATH=<file> records LLM and tool calls for offline replay
+config = {"configurable": {"thread_id": "1"}, "callbacks": recording_callbacks()}
 
 
 while True:
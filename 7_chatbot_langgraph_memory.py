@@ -1,18 +1,26 @@
 import os
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
+from llm_clients import groq_chat_model
+from model_cascade import groq_cascade
 from typing import Annotated
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
+from fanout_graph import build_fanout_graph
 from langgraph.checkpoint.memory import InMemorySaver
+from record_replay import recording_callbacks
 
 memory = InMemorySaver()
 load_dotenv()
-config = {"configurable": {"thread_id": "1"}}
+# CASSETTE_PATH=<file> records LLM and tool calls for offline replay
+config = {"configurable": {"thread_id": "1"}, "callbacks": recording_callbacks()}
 
 # initialize the LLM
-llm = init_chat_model("llama-3.3-70b-versatile", model_provider="groq")
+# MODEL_CASCADE=1 sends easy prompts to a small model, escalating to the 70b when needed
+if os.getenv("MODEL_CASCADE") == "1":
+   llm = groq_cascade()
+else:
+   llm = groq_chat_model("llama-3.3-70b-versatile")
 
 # graph state definition
 class State(TypedDict):
@@ -36,6 +44,10 @@ graph_builder.add_edge("chatbot", END)
 # compile the graph
 graph = graph_builder.compile(checkpointer=memory)
 
+# CHAT_FANOUT=1 splits multi-part questions and answers the parts in parallel branches
+if os.getenv("CHAT_FANOUT") == "1":
+   graph = build_fanout_graph(llm, max_workers=int(os.getenv("FANOUT_WORKERS", "4")), checkpointer=memory)
+
 
 
 # # save the graph as a png file
@@ -54,7 +66,9 @@ graph = graph_builder.compile(checkpointer=memory)
 def stream_graph_updates(user_input: str):
    for event in graph.stream({"messages": [{"role": "user", "content": user_input}]}, config=config):
        for value in event.values():
-           print("Assistant:", value["messages"][-1].content)
+           # fan-out split/answer nodes write no messages
+           if value and "messages" in value:
+               print("Assistant:", value["messages"][-1].content)
 
 
 
@@ -4,6 +4,10 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.checkpoint.memory import InMemorySaver
+from record_replay import recording_callbacks
+from tracing import tracing_callbacks, traced_checkpointer
+from stream_renderer import render_stream
+from tool_selector import ToolSelector
 
 import os
 
@@ -42,8 +46,14 @@ async def run_agent():
     
     llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", include_thoughts=True)
     tools = await client.get_tools()
-    agent = create_react_agent(llm, tools, checkpointer=InMemorySaver())
-    config = {"configurable": {"thread_id": "1"}}
+    # TOOL_SELECTION=1 binds only the tools relevant to each turn (TOOL_TOP_K, default 8)
+    model = llm
+    if os.getenv("TOOL_SELECTION") == "1":
+        model = ToolSelector(llm, tools, k=int(os.getenv("TOOL_TOP_K", "8")))
+    agent = create_react_agent(model, tools, checkpointer=traced_checkpointer(InMemorySaver()))
+    # CASSETTE_PATH=<file> records LLM and tool calls for offline replay,
+    # TRACE_DIR=<dir> writes per-node/tool/checkpoint traces
+    config = {"configurable": {"thread_id": "1"}, "callbacks": recording_callbacks() + tracing_callbacks()}
 
     print("Type 'exit' to quit.")
     while True:
@@ -51,21 +61,7 @@ async def run_agent():
         if user_input.strip().lower() == "exit":
             break
         input_message = {"role": "user", "content": user_input}
-        async for response in agent.astream(
-            {"messages": [input_message]},
-            stream_mode="values",
-            config=config
-        ):
-            resp = response["messages"][-1]
-            if hasattr(resp, "content") and isinstance(resp.content, list):
-                for item in resp.content:
-                    if isinstance(item, dict) and item.get("type") == "thinking":
-                        print("Thinking:", item["thinking"])
-                    elif isinstance(item, str):
-                        print("Final Response:", item)
-            else:
-                print(resp)
-        
+        await render_stream(agent, {"messages": [input_message]}, config)
 
 
 
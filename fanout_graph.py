@@ -0,0 +1,206 @@
+"""
+Map-reduce fan-out for multi-part questions.
+
+The chatbot graph answers "What is X? How does Y work? Compare Z." in one
+long sequential generation. build_fanout_graph() splits such a question
+into sub-questions, answers each in its own parallel branch (at most
+`max_workers` LLM calls at once) and merges the answers into a single
+assistant message in a reduce node. Every branch is given the whole
+question and asked to answer only its part, so follow-ups such as "When
+should I use each?" keep their context. Single questions skip the split
+and go through the usual chatbot node, so they cost nothing extra.
+
+    START -> split -+-> answer (one branch per sub-question) -> merge -> END
+                    +-> chatbot ---------------------------------------> END
+
+Only the user message and the merged answer are added to `messages`, so the
+checkpointed thread looks the same as with the single-node graph.
+
+    python fanout_graph.py   # latency vs the single-node graph with a fake per-token LLM
+"""
+
+import re
+import threading
+from typing import Annotated, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.types import Send
+from typing_extensions import TypedDict
+
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.+?)\s*$", re.MULTILINE)
+_SENTENCE_END = re.compile(r"(?<=[.?!])\s+|\n+")
+# Imperative parts that can be answered on their own, like "Compare Z."
+_REQUEST = re.compile(
+    r"^(?:compare|contrast|describe|define|explain|give|list|name|show|summari[sz]e|write|tell)\b", re.IGNORECASE
+)
+
+
+def _independent(part: str) -> bool:
+    return len(part.split()) >= 2 and (part.endswith("?") or bool(_REQUEST.match(part)))
+
+
+def split_questions(text: str, max_parts: int = 8) -> List[str]:
+    """
+    Sub-questions of `text`: list items, or its sentences
+
+    Returns [text] when the question does not split, or when a split would
+    lose part of it: text outside the list items, or a sentence that is
+    neither a question nor a request.
+    """
+    items = _LIST_ITEM.findall(text)
+    if len(items) >= 2:
+        if _LIST_ITEM.sub("", text).strip():
+            return [text]
+    else:
+        items = [part.strip() for part in _SENTENCE_END.split(text) if part.strip()]
+        if len(items) < 2 or not all(_independent(part) for part in items):
+            return [text]
+    if len(items) > max_parts:
+        return [text]
+    return items
+
+
+def _collect(left: Optional[list], right: Optional[list]) -> list:
+    # None from the split node starts the turn with no answers
+    if right is None:
+        return []
+    return (left or []) + right
+
+
+class FanOutState(TypedDict):
+    messages: Annotated[list, add_messages]
+    sub_questions: List[str]
+    answers: Annotated[list, _collect]  # (index, text), in completion order
+
+
+class SubQuestion(TypedDict):
+    index: int
+    question: str
+    original: str
+    history: list
+
+
+def merge_answers(sub_questions: List[str], answers: list) -> str:
+    by_index = dict(answers)
+    return "\n\n".join(
+        f"**{n + 1}. {question}**\n{by_index.get(n, '')}" for n, question in enumerate(sub_questions)
+    )
+
+
+def build_fanout_graph(llm, max_workers: int = 4, checkpointer=None):
+    """
+    Chatbot graph that answers multi-part questions in parallel branches
+
+    Args:
+        llm: Chat model used by every branch
+        max_workers: LLM calls in flight at once within a turn
+        checkpointer: Saver for the thread, as in graph_builder.compile()
+    """
+    workers = threading.BoundedSemaphore(max_workers)
+
+    def split(state: FanOutState):
+        return {"sub_questions": split_questions(state["messages"][-1].content), "answers": None}
+
+    def route(state: FanOutState):
+        parts = state["sub_questions"]
+        if len(parts) < 2:
+            return "chatbot"
+        history = state["messages"][:-1]
+        original = state["messages"][-1].content
+        return [
+            Send("answer", {"index": n, "question": q, "original": original, "history": history})
+            for n, q in enumerate(parts)
+        ]
+
+    def chatbot(state: FanOutState):
+        return {"messages": [llm.invoke(state["messages"])]}
+
+    def answer(part: SubQuestion):
+        # Every branch sees the whole question, so "When should I use each?"
+        # keeps its context; it is only asked to answer its own part
+        prompt = HumanMessage(f"{part['original']}\n\nAnswer only this part: {part['question']}")
+        # Branches run on the graph's thread pool, the semaphore bounds the LLM calls
+        with workers:
+            response = llm.invoke(part["history"] + [prompt])
+        return {"answers": [(part["index"], response.content)]}
+
+    def merge(state: FanOutState):
+        return {"messages": [AIMessage(merge_answers(state["sub_questions"], state["answers"]))]}
+
+    graph_builder = StateGraph(FanOutState)
+    graph_builder.add_node("split", split)
+    graph_builder.add_node("chatbot", chatbot)
+    graph_builder.add_node("answer", answer)
+    graph_builder.add_node("merge", merge)
+    graph_builder.add_edge(START, "split")
+    graph_builder.add_conditional_edges("split", route, ["chatbot", "answer"])
+    graph_builder.add_edge("answer", "merge")
+    graph_builder.add_edge("chatbot", END)
+    graph_builder.add_edge("merge", END)
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import time
+
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from record_replay import build_chatbot_graph
+
+    TOKEN_DELAY = 0.005
+    TOKENS_PER_ANSWER = 80
+    FIRST_TOKEN = 0.2
+
+    class PerTokenChatModel(BaseChatModel):
+        """Fake LLM: first-token latency plus a fixed delay per generated token"""
+
+        @property
+        def _llm_type(self) -> str:
+            return "per-token-fake"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            content = messages[-1].content
+            parts = [content] if "Answer only this part:" in content else split_questions(content)
+            tokens = TOKENS_PER_ANSWER * len(parts)
+            time.sleep(FIRST_TOKEN + tokens * TOKEN_DELAY)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(" ".join(["tok"] * tokens)))])
+
+    QUESTIONS = [
+        "What is LangGraph?",
+        "What is a checkpointer? How does a thread id work?",
+        "1. What is a node\n2. What is an edge\n3. What is a reducer\n4. What is a Send",
+        "What is MCP? How do tools get converted? Why pool sessions? How does streaming work? "
+        "What is a structured response? How do I trace a run?",
+    ]
+
+    llm = PerTokenChatModel()
+    single = build_chatbot_graph(llm, checkpointer=InMemorySaver())
+    fanout = build_fanout_graph(llm, max_workers=4, checkpointer=InMemorySaver())
+
+    print(f"fake LLM: {FIRST_TOKEN * 1000:.0f} ms first token, {TOKEN_DELAY * 1000:.0f} ms/token, "
+          f"{TOKENS_PER_ANSWER} tokens per sub-answer, 4 workers")
+    print(f"{'parts':>5} {'single-node':>12} {'fan-out':>9} {'speedup':>8}")
+
+    async def timed(graph, inputs, config) -> float:
+        started = time.perf_counter()
+        await graph.ainvoke(inputs, config)
+        return time.perf_counter() - started
+
+    for n, question in enumerate(QUESTIONS):
+        inputs = {"messages": [{"role": "user", "content": question}]}
+        config = {"configurable": {"thread_id": str(n)}}
+        # build_chatbot_graph() has an async node, the sync fan-out nodes run on the executor
+        single_s = asyncio.run(timed(single, inputs, config))
+        fanout_s = asyncio.run(timed(fanout, inputs, config))
+        print(f"{len(split_questions(question)):>5} {single_s * 1000:>10.0f}ms {fanout_s * 1000:>7.0f}ms "
+              f"{single_s / fanout_s:>7.2f}x")
+
+    # The merged answer is the thread's last message
+    state = fanout.get_state({"configurable": {"thread_id": "3"}})
+    print(f"checkpointed thread: {len(state.values['messages'])} messages, "
+          f"last has {state.values['messages'][-1].content.count('**') // 2} merged sections")
@@ -0,0 +1,209 @@
+"""
+Shared generation scheduler with per-session fair queuing and cancellation.
+
+Generations run as asyncio tasks on one background event loop instead of in
+the caller's thread. At most `max_concurrent` run at once; waiting work is
+picked round-robin across sessions, so one heavy session cannot starve the
+others. A new generation from a session supersedes (cancels) the session's
+queued or running one, and cancelling a running generation cancels its task,
+which aborts the in-flight LLM request or tool call instead of letting it
+run to completion.
+
+    scheduler = GenerationScheduler(max_concurrent=4)
+    generation = scheduler.submit(session_id, stream_factory)   # async iterator of text
+    for text in generation.stream():
+        ...
+    generation.cancel()   # no-op once finished
+"""
+
+import asyncio
+import queue
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional
+
+_DONE = object()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for metrics"""
+    return max(1, len(text) // 4) if text else 0
+
+
+class Generation:
+    """Handle to one scheduled generation, consumed from the submitting thread"""
+
+    def __init__(self, scheduler: "GenerationScheduler", session_id: str,
+                 factory: Callable[[], AsyncIterator[str]]):
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.factory = factory
+        self.state = "queued"  # queued -> running -> done | cancelled | failed
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+        self.tokens = 0
+        self.error: Optional[BaseException] = None
+        self._events: "queue.Queue" = queue.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "cancelled", "failed")
+
+    def cancel(self):
+        if not self.finished:
+            self.scheduler.cancel(self)
+
+    def stream(self, poll: float = 0.25, on_wait: Optional[Callable[["Generation"], None]] = None) -> Iterator[str]:
+        """
+        Yield text chunks as they are produced
+
+        `on_wait` is called every `poll` seconds while nothing arrives, which
+        lets the caller show progress (and, in Streamlit, notice reruns).
+        """
+        while True:
+            try:
+                item = self._events.get(timeout=poll)
+            except queue.Empty:
+                if on_wait is not None:
+                    on_wait(self)
+                continue
+            if item is _DONE:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield item
+
+
+class GenerationScheduler:
+    """
+    Args:
+        max_concurrent: Generations running at once across all sessions
+    """
+
+    def __init__(self, max_concurrent: int = 4):
+        self.max_concurrent = max_concurrent
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="generation-scheduler", daemon=True)
+        self._thread.start()
+
+        # Only touched from the loop thread
+        self._waiting: "OrderedDict[str, Deque[Generation]]" = OrderedDict()
+        self._running: Dict[str, List[Generation]] = {}
+        self._active = 0
+
+        # Metrics
+        self.queue_waits: Deque[float] = deque(maxlen=1000)
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.used_tokens = 0
+        self.wasted_tokens = 0
+
+    def submit(self, session_id: str, factory: Callable[[], AsyncIterator[str]],
+               supersede: bool = True) -> Generation:
+        """Queue a generation; with `supersede`, earlier work of the session is cancelled"""
+        generation = Generation(self, session_id, factory)
+        self._loop.call_soon_threadsafe(self._enqueue, generation, supersede)
+        return generation
+
+    def cancel(self, generation: Generation):
+        self._loop.call_soon_threadsafe(self._cancel, generation)
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiting) for waiting in list(self._waiting.values()))
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self.queue_waits)
+        return {
+            "running": self._active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "queue_wait_p50_ms": statistics.median(waits) * 1000 if waits else 0.0,
+            "queue_wait_p95_ms": waits[max(0, int(len(waits) * 0.95) - 1)] * 1000 if waits else 0.0,
+            "used_tokens": self.used_tokens,
+            "wasted_tokens": self.wasted_tokens,
+        }
+
+    # Loop thread only below
+
+    def _enqueue(self, generation: Generation, supersede: bool):
+        session_id = generation.session_id
+        if supersede:
+            for earlier in list(self._waiting.get(session_id, ())) + self._running.get(session_id, []):
+                self._cancel(earlier)
+        self._waiting.setdefault(session_id, deque()).append(generation)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._active < self.max_concurrent and self._waiting:
+            # Round-robin: take the first waiting session, then move it to the back
+            session_id, waiting = next(iter(self._waiting.items()))
+            generation = waiting.popleft()
+            if waiting:
+                self._waiting.move_to_end(session_id)
+            else:
+                del self._waiting[session_id]
+
+            self._active += 1
+            generation.state = "running"
+            generation.started = time.perf_counter()
+            self.queue_waits.append(generation.started - generation.submitted)
+            self._running.setdefault(session_id, []).append(generation)
+            generation._task = self._loop.create_task(self._run(generation))
+            generation._task.add_done_callback(lambda task, g=generation: self._on_done(g, task))
+
+    def _cancel(self, generation: Generation):
+        if generation.finished:
+            return
+        if generation.state == "queued":
+            waiting = self._waiting.get(generation.session_id)
+            if waiting and generation in waiting:
+                waiting.remove(generation)
+                if not waiting:
+                    del self._waiting[generation.session_id]
+            self._finish(generation, "cancelled")
+        elif generation._task is not None:
+            generation._task.cancel()
+
+    async def _run(self, generation: Generation):
+        async for text in generation.factory():
+            generation.tokens += estimate_tokens(text)
+            generation._events.put(text)
+
+    def _on_done(self, generation: Generation, task: asyncio.Task):
+        # A done callback also runs for tasks cancelled before their first step
+        if task.cancelled():
+            state = "cancelled"
+        elif task.exception() is not None:
+            generation.error = task.exception()
+            state = "failed"
+        else:
+            state = "done"
+
+        self._active -= 1
+        running = self._running.get(generation.session_id, [])
+        if generation in running:
+            running.remove(generation)
+            if not running:
+                del self._running[generation.session_id]
+        self._finish(generation, state)
+        self._dispatch()
+
+    def _finish(self, generation: Generation, state: str):
+        generation.state = state
+        if state == "done":
+            self.completed += 1
+            self.used_tokens += generation.tokens
+        elif state == "cancelled":
+            self.cancelled += 1
+            # Tokens produced for an answer nobody will read
+            self.wasted_tokens += generation.tokens
+        else:
+            self.failed += 1
+        generation._events.put(_DONE)
@@ -0,0 +1,234 @@
+"""
+Shared, pooled HTTP clients for the LLM providers.
+
+Every script used to build its own provider client, so each session paid for
+DNS, TLS and HTTP/2 setup on its first request. ProviderClients owns one
+keep-alive connection pool per process (sync and async), shared by the
+OpenAI-compatible HF router client and the Groq chat models, and can open
+connections ahead of time in a background thread.
+
+Environment:
+    LLM_POOL_SIZE       max connections per pool (default 20)
+    LLM_POOL_KEEPALIVE  idle keep-alive connections kept per pool (default 10)
+    LLM_PREWARM         "1" to pre-warm provider hosts at startup
+
+    python llm_clients.py   # first-request / steady-state benchmark against a local TLS stub
+"""
+
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+# Pool settings are read at import time, before the scripts call load_dotenv()
+load_dotenv()
+
+HF_ROUTER_URL = "https://router.huggingface.co/v1"
+GROQ_URL = "https://api.groq.com"
+
+# HTTP/2 needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class ProviderClients:
+    """
+    Lazily created, process-wide httpx clients with keep-alive pools
+
+    Args:
+        max_connections: Upper bound of open connections per pool
+        max_keepalive: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept
+        timeout: Request timeout in seconds
+        verify: TLS verification, passed through to httpx
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+        verify=True,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.verify = verify
+        self._lock = threading.Lock()
+        self._sync: Optional[httpx.Client] = None
+        self._async: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls) -> "ProviderClients":
+        return cls(
+            max_connections=int(os.getenv("LLM_POOL_SIZE", "20")),
+            max_keepalive=int(os.getenv("LLM_POOL_KEEPALIVE", "10")),
+        )
+
+    @property
+    def sync(self) -> httpx.Client:
+        with self._lock:
+            if self._sync is None:
+                self._sync = httpx.Client(
+                    limits=self.limits, timeout=self.timeout,
+                    verify=self.verify, http2=HTTP2_AVAILABLE,
+                )
+            return self._sync
+
+    @property
+    def async_(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async is None:
+                self._async = httpx.AsyncClient(
+                    limits=self.limits, timeout=self.timeout,
+                    verify=self.verify, http2=HTTP2_AVAILABLE,
+                )
+            return self._async
+
+    def prewarm(self, urls: Iterable[str], connections: int = 2, background: bool = True):
+        """
+        Open `connections` pooled connections to each url ahead of the first request
+
+        Any response (even an error status) leaves a warm connection in the
+        pool, and failures are ignored: pre-warming is best effort.
+        """
+        targets = [url for url in urls for _ in range(connections)]
+
+        def warm(url: str):
+            try:
+                self.sync.head(url)
+            except httpx.HTTPError:
+                pass
+
+        def run():
+            with ThreadPoolExecutor(max_workers=max(1, len(targets))) as pool:
+                list(pool.map(warm, targets))
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="llm-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        with self._lock:
+            if self._sync is not None:
+                self._sync.close()
+                self._sync = None
+            # The async client belongs to an event loop, callers close it with aclose()
+            self._async = None
+
+
+clients = ProviderClients.from_env()
+
+if os.getenv("LLM_PREWARM") == "1":
+    clients.prewarm([HF_ROUTER_URL, GROQ_URL])
+
+
+def openai_client(base_url: str = HF_ROUTER_URL, api_key: Optional[str] = None, **kwargs):
+    """OpenAI(-compatible) client on the shared pool"""
+    from openai import OpenAI
+
+    return OpenAI(base_url=base_url, api_key=api_key, http_client=clients.sync, **kwargs)
+
+
+def groq_chat_model(model: str = "llama-3.3-70b-versatile", **kwargs):
+    """init_chat_model for a Groq model, on the shared pools"""
+    from langchain.chat_models import init_chat_model
+
+    return init_chat_model(
+        model,
+        model_provider="groq",
+        http_client=clients.sync,
+        http_async_client=clients.async_,
+        **kwargs,
+    )
+
+
+if __name__ == "__main__":
+    # First-request and steady-state latency against a local TLS stub server
+    import http.server
+    import ssl
+    import statistics
+    import subprocess
+    import tempfile
+    import time
+
+    class StubHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes, don't let Nagle delay the body
+        disable_nagle_algorithm = True
+
+        def _reply(self):
+            # Consume the request body, or it is parsed as the next request on the connection
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            body = b'{"choices": []}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        do_GET = do_POST = do_HEAD = _reply
+
+        def log_message(self, *args):
+            pass
+
+    class StubServer(http.server.ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            # Clients closing keep-alive connections without a TLS close_notify
+            pass
+
+    workdir = tempfile.mkdtemp()
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    server = StubServer(("localhost", 0), StubHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"https://localhost:{server.server_address[1]}/v1/chat/completions"
+
+    def timed(client: httpx.Client) -> float:
+        started = time.perf_counter()
+        client.post(url, json={"messages": []}).raise_for_status()
+        return (time.perf_counter() - started) * 1000
+
+    rounds = 30
+    # Before: a new client per session, so every session's first request is cold
+    cold_first = []
+    for _ in range(rounds):
+        with httpx.Client(verify=cert) as fresh:
+            cold_first.append(timed(fresh))
+
+    # After: a shared pool, pre-warmed at startup (fresh pool per round)
+    warm_first = []
+    for _ in range(rounds):
+        shared = ProviderClients(verify=cert)
+        shared.prewarm([url], connections=2, background=False)
+        warm_first.append(timed(shared.sync))
+        shared.close()
+
+    shared = ProviderClients(verify=cert)
+    steady = [timed(shared.sync) for _ in range(200)]
+
+    print(f"first request, new client per session: {statistics.median(cold_first):.2f} ms (median of {rounds})")
+    print(f"first request, shared pre-warmed pool: {statistics.median(warm_first):.2f} ms (median of {rounds})")
+    print(f"steady state, shared pool:             {statistics.median(steady):.2f} ms")
+    shared.close()
+    server.shutdown()
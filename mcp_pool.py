@@ -0,0 +1,282 @@
+"""
+Pooled, concurrent MCP client sessions.
+
+Tools returned by MultiServerMCPClient.get_tools() open a brand new session
+for every call: connect, initialize handshake, call, tear down. PooledMCPClient
+keeps a few long-lived sessions per server open instead and lets several tool
+calls be in flight at once on them, with a per-server concurrency limit and a
+per-call timeout.
+
+Usage (same connection dicts as MultiServerMCPClient, plus optional
+"pool_size", "max_concurrency", "timeout", "reconnect_delay" and
+"idle_check" keys per server, see PooledMCPServer):
+
+    async with PooledMCPClient({"es": {"url": ..., "transport": "streamable_http"}}) as client:
+        tools = await client.get_tools()
+
+    python mcp_pool.py   # throughput benchmark against a local stub MCP server
+"""
+
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import anyio
+import httpx
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+from mcp.shared.exceptions import McpError
+
+
+class _Slot:
+    """One pooled session, owned by the task that keeps it open"""
+
+    def __init__(self):
+        self.session: Any = None
+        self.in_flight = 0
+        self.error: Optional[BaseException] = None
+        self.last_used = 0.0
+        self.opened = asyncio.Event()  # set once an open attempt finished, ok or not
+        self.reopen = asyncio.Event()  # set to close the session (and open a new one)
+        self.task: Optional[asyncio.Task] = None
+
+
+class PooledMCPServer:
+    """
+    A fixed set of initialized sessions to one MCP server
+
+    Calls go to the session with the fewest calls in flight; MCP sessions
+    match responses by request id, so one session carries several concurrent
+    calls.
+
+    Each session is opened and closed by its own background task (the MCP
+    client transports must be exited by the task that entered them). When a
+    session breaks, e.g. the server restarted or its stream dropped while
+    the chat loop sat in input(), the task replaces it; calls made in the
+    meantime use a one-off session. A session idle for `idle_check` seconds
+    is pinged before it is used again, so a server restart during a long
+    pause costs a ping instead of a failed or timed-out tool call.
+
+    Args:
+        connection: langchain_mcp_adapters connection dict
+        pool_size: Number of sessions kept open
+        max_concurrency: Calls in flight to this server at once, the rest wait
+        timeout: Seconds to wait for a single tool result
+        reconnect_delay: Seconds between attempts to reopen a failed session
+        idle_check: Seconds of idleness after which a session is pinged before use
+    """
+
+    def __init__(
+        self,
+        connection: Dict[str, Any],
+        pool_size: int = 2,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = 30.0,
+        reconnect_delay: float = 1.0,
+        idle_check: float = 30.0,
+    ):
+        self.connection = connection
+        self.pool_size = pool_size
+        self.timeout = timedelta(seconds=timeout) if timeout else None
+        self.reconnect_delay = reconnect_delay
+        self.idle_check = idle_check
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._slots: List[_Slot] = []
+        self._closing = False
+        self.reconnects = 0
+
+    async def start(self, stack: AsyncExitStack):
+        stack.push_async_callback(self._stop)
+        for _ in range(self.pool_size):
+            slot = _Slot()
+            slot.task = asyncio.create_task(self._keep_open(slot))
+            self._slots.append(slot)
+        for slot in self._slots:
+            await slot.opened.wait()
+            if slot.session is None:
+                raise slot.error
+
+    async def _keep_open(self, slot: _Slot):
+        while not self._closing:
+            try:
+                async with create_session(self.connection) as session:
+                    await session.initialize()
+                    if slot.opened.is_set():
+                        self.reconnects += 1
+                    slot.session, slot.error = session, None
+                    slot.last_used = time.monotonic()
+                    slot.opened.set()
+                    await slot.reopen.wait()
+            except Exception as error:
+                slot.error = error
+            finally:
+                slot.session = None
+                slot.reopen.clear()
+            slot.opened.set()
+            if slot.error is not None and not self._closing:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _stop(self):
+        self._closing = True
+        for slot in self._slots:
+            slot.reopen.set()
+        await asyncio.gather(*(slot.task for slot in self._slots), return_exceptions=True)
+
+    def _pick(self) -> Optional[_Slot]:
+        open_slots = [slot for slot in self._slots if slot.session is not None]
+        return min(open_slots, key=lambda slot: slot.in_flight, default=None)
+
+    async def _alive(self, slot: _Slot) -> bool:
+        try:
+            await asyncio.wait_for(slot.session.send_ping(), timeout=2.0)
+            return True
+        except Exception:
+            return False
+
+    async def _call_once(self, name: str, arguments: Optional[Dict[str, Any]]):
+        async with create_session(self.connection) as session:
+            await session.initialize()
+            return await session.call_tool(name, arguments, read_timeout_seconds=self.timeout)
+
+    async def list_tools(self):
+        # Tool listing is paginated by the server
+        tools, cursor = [], None
+        while True:
+            page = await self._pick().session.list_tools(cursor=cursor)
+            tools.extend(page.tools)
+            cursor = page.nextCursor
+            if not cursor:
+                return tools
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        """Same signature as ClientSession.call_tool, so converted tools can use the pool"""
+        async with self._semaphore:
+            slot = self._pick()
+            if slot is not None and time.monotonic() - slot.last_used > self.idle_check:
+                if not await self._alive(slot):
+                    # The server likely restarted, the other idle sessions are
+                    # as stale; they get pinged on their next use
+                    slot.reopen.set()
+                    slot = None
+            if slot is None:
+                return await self._call_once(name, arguments)
+            slot.in_flight += 1
+            try:
+                return await slot.session.call_tool(
+                    name, arguments, read_timeout_seconds=self.timeout
+                )
+            except (McpError, anyio.ClosedResourceError, anyio.BrokenResourceError, httpx.TransportError):
+                # Timeouts and JSON-RPC errors also happen on healthy sessions, so
+                # only a session that no longer answers a ping is replaced. The
+                # error is raised either way: a write tool may already have run
+                if not await self._alive(slot):
+                    slot.reopen.set()
+                raise
+            finally:
+                slot.in_flight -= 1
+                slot.last_used = time.monotonic()
+
+
+class PooledMCPClient:
+    """MultiServerMCPClient replacement whose tools share pooled sessions"""
+
+    def __init__(self, connections: Dict[str, Dict[str, Any]]):
+        self.servers: Dict[str, PooledMCPServer] = {}
+        for name, connection in connections.items():
+            connection = dict(connection)
+            pool_options = {
+                key: connection.pop(key)
+                for key in ("pool_size", "max_concurrency", "timeout", "reconnect_delay", "idle_check")
+                if key in connection
+            }
+            self.servers[name] = PooledMCPServer(connection, **pool_options)
+        self._stack: Optional[AsyncExitStack] = None
+
+    async def __aenter__(self) -> "PooledMCPClient":
+        self._stack = AsyncExitStack()
+        await self._stack.__aenter__()
+        try:
+            for server in self.servers.values():
+                await server.start(self._stack)
+        except BaseException:
+            await self._stack.aclose()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._stack.__aexit__(*exc_info)
+
+    async def get_tools(self, server_name: Optional[str] = None) -> List[BaseTool]:
+        names = [server_name] if server_name else list(self.servers)
+        tools = []
+        for name in names:
+            server = self.servers[name]
+            for tool in await server.list_tools():
+                tools.append(convert_mcp_tool_to_langchain_tool(server, tool))
+        return tools
+
+
+if __name__ == "__main__":
+    # Throughput against a local stub MCP server with simulated latency
+    import logging
+    import socket
+    import threading
+
+    import uvicorn
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+    from mcp.server.fastmcp import FastMCP
+
+    LATENCY = 0.02
+    CALLS = 200
+    CONCURRENCY = 16
+
+    stub = FastMCP("stub-elasticsearch", log_level="WARNING")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    @stub.tool()
+    async def search(index: str, query: str) -> str:
+        """Search an index"""
+        await asyncio.sleep(LATENCY)
+        return f"{index}: 3 hits for {query}"
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        stub.streamable_http_app(), host="127.0.0.1", port=port, log_level="error"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    connection = {"url": f"http://127.0.0.1:{port}/mcp", "transport": "streamable_http"}
+
+    async def drive(tool: BaseTool) -> float:
+        gate = asyncio.Semaphore(CONCURRENCY)
+
+        async def one(n: int):
+            async with gate:
+                await tool.ainvoke({"index": "logs", "query": f"error {n}"})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(CALLS)))
+        return CALLS / (time.perf_counter() - started)
+
+    async def main():
+        baseline_tools = await MultiServerMCPClient({"stub": connection}).get_tools()
+        baseline = await drive(baseline_tools[0])
+
+        async with PooledMCPClient(
+            {"stub": {**connection, "pool_size": 2, "max_concurrency": CONCURRENCY}}
+        ) as client:
+            pooled = await drive((await client.get_tools())[0])
+
+        print(f"{CALLS} calls, {CONCURRENCY} concurrent, {LATENCY * 1000:.0f} ms simulated latency")
+        print(f"session per call (MultiServerMCPClient): {baseline:.1f} calls/s")
+        print(f"pooled sessions (PooledMCPClient):       {pooled:.1f} calls/s")
+
+    asyncio.run(main())
+    server.should_exit = True
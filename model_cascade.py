@@ -0,0 +1,331 @@
+"""
+Model cascade: route easy prompts to a small, fast model.
+
+A cheap local classifier scores the latest user message. Prompts it is
+confident are simple go to the small model; its answer is kept only if it
+passes a quality check, otherwise the prompt is escalated to the large model.
+Everything else goes straight to the large model.
+
+    llm = groq_cascade()   # llama-3.1-8b-instant -> llama-3.3-70b-versatile
+
+Set MODEL_CASCADE=1 to use it in the Groq scripts.
+
+    python model_cascade.py   # fit on the train split, report routing, escalations and cost on held-out fixtures
+"""
+
+import math
+import re
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import Field
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+_BRIEF = re.compile(r"\b(in one line|one word|in a word|briefly|short answer|quick(ly)?|tl;?dr)\b")
+_FACTUAL = re.compile(r"^(who|what|when|where|which|is|are|was|were|how (many|much|old|tall|far))\b")
+_COMPLEX = re.compile(
+    r"\b(explain|why|compare|contrast|analy[sz]e|design|implement|architecture|debug|refactor|"
+    r"prove|derive|step[- ]by[- ]step|in detail|detailed|essay|pros and cons|trade-?offs?|"
+    r"write (a |an )?(program|function|script|code|class)|optimi[sz]e|plan)\b"
+)
+_CODE = re.compile(r"```|\bdef |\bclass |\bimport |[{};]\s*$", re.MULTILINE)
+
+# Weights fitted with SimplePromptClassifier.fit() on the TRAIN split of FIXTURES
+DEFAULT_WEIGHTS = {
+    "bias": 11.09,
+    "log_words": -4.51,
+    "brief": 2.55,
+    "factual": 4.11,
+    "complex": -6.94,
+    "code": -0.35,
+    "questions": -3.4,
+    "sentences": -3.71,
+}
+
+
+def prompt_features(text: str) -> Dict[str, float]:
+    lowered = text.strip().lower()
+    words = lowered.split()
+    return {
+        "bias": 1.0,
+        "log_words": math.log1p(len(words)),
+        "brief": 1.0 if _BRIEF.search(lowered) else 0.0,
+        "factual": 1.0 if _FACTUAL.search(lowered) else 0.0,
+        "complex": 1.0 if _COMPLEX.search(lowered) else 0.0,
+        "code": 1.0 if _CODE.search(text) else 0.0,
+        "questions": float(max(0, lowered.count("?") - 1)),
+        "sentences": float(max(0, len(re.findall(r"[.!?](\s|$)", lowered)) - 1)),
+    }
+
+
+class SimplePromptClassifier:
+    """Logistic scorer over a handful of text features; returns P(simple)"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+
+    def score(self, features: Dict[str, float]) -> float:
+        z = sum(self.weights.get(name, 0.0) * value for name, value in features.items())
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def __call__(self, text: str) -> float:
+        return self.score(prompt_features(text))
+
+    def fit(self, prompts: Sequence[str], simple: Sequence[bool], epochs: int = 500, lr: float = 0.1):
+        """Refit the weights on labeled prompts with plain gradient descent"""
+        rows = [prompt_features(p) for p in prompts]
+        for _ in range(epochs):
+            for features, label in zip(rows, simple):
+                error = float(label) - self.score(features)
+                for name, value in features.items():
+                    self.weights[name] = self.weights.get(name, 0.0) + lr * error * value
+        return self
+
+
+_REFUSAL = re.compile(r"\b(i('m| am) not sure|i don'?t know|i cannot|i can'?t (help|answer)|as an ai)\b", re.I)
+
+
+def default_quality_check(message: AIMessage) -> bool:
+    """Reject empty, truncated or hedging small-model answers"""
+    text = message.text() if callable(getattr(message, "text", None)) else str(message.content)
+    if not text.strip() and not getattr(message, "tool_calls", None):
+        return False
+    if (message.response_metadata or {}).get("finish_reason") == "length":
+        return False
+    return not _REFUSAL.search(text)
+
+
+def _last_user_text(messages: Sequence[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.text() if callable(getattr(message, "text", None)) else str(message.content)
+    return ""
+
+
+class CascadeChatModel(BaseChatModel):
+    """
+    Chat model that tries `small` first for prompts classified as simple
+
+    Args:
+        small: Cheap, fast model
+        large: Model used for everything else and for escalations
+        classifier: text -> P(simple)
+        threshold: Minimum P(simple) to try the small model
+        quality_check: AIMessage -> bool, a failing small answer is escalated
+    """
+
+    small: Runnable
+    large: Runnable
+    classifier: Callable[[str], float] = Field(default_factory=SimplePromptClassifier)
+    threshold: float = 0.7
+    quality_check: Callable[[AIMessage], bool] = default_quality_check
+    stats: Dict[str, int] = Field(default_factory=lambda: {"small": 0, "large": 0, "escalated": 0})
+
+    @property
+    def _llm_type(self) -> str:
+        return "cascade"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={
+            "small": self.small.bind_tools(tools, **kwargs),
+            "large": self.large.bind_tools(tools, **kwargs),
+        })
+
+    def _route(self, messages) -> bool:
+        return self.classifier(_last_user_text(messages)) >= self.threshold
+
+    def _result(self, message: AIMessage, route: str) -> ChatResult:
+        self.stats[route] += 1
+        message.response_metadata = {**(message.response_metadata or {}), "cascade_route": route}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self._route(messages):
+            answer = self.small.invoke(messages, stop=stop, **kwargs)
+            if self.quality_check(answer):
+                return self._result(answer, "small")
+            self.stats["escalated"] += 1
+        return self._result(self.large.invoke(messages, stop=stop, **kwargs), "large")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self._route(messages):
+            answer = await self.small.ainvoke(messages, stop=stop, **kwargs)
+            if self.quality_check(answer):
+                return self._result(answer, "small")
+            self.stats["escalated"] += 1
+        return self._result(await self.large.ainvoke(messages, stop=stop, **kwargs), "large")
+
+
+def groq_cascade(small: str = SMALL_MODEL, large: str = LARGE_MODEL, **kwargs) -> CascadeChatModel:
+    """Cascade of two Groq models on the shared HTTP pools"""
+    from llm_clients import groq_chat_model
+
+    return CascadeChatModel(small=groq_chat_model(small), large=groq_chat_model(large), **kwargs)
+
+
+# Labeled offline fixtures: (prompt, is_simple, what the small model answers).
+# The small-model answers are canned: "ok", or a failure default_quality_check
+# should catch ("empty", "truncated", "refusal"). A complex prompt answered
+# "ok" by the small model passes the check, i.e. a quality miss it cannot see.
+FIXTURES = [
+    ("who is modi in one line", True, "ok"),
+    ("What is the capital of France?", True, "ok"),
+    ("when was he born and in which city?", True, "refusal"),
+    ("What is 17 * 23?", True, "ok"),
+    ("Translate 'good morning' to Spanish", True, "ok"),
+    ("Who wrote Pride and Prejudice?", True, "ok"),
+    ("How many continents are there?", True, "ok"),
+    ("Give me a synonym for happy", True, "ok"),
+    ("What year did World War II end?", True, "ok"),
+    ("Is Python dynamically typed?", True, "ok"),
+    ("Define photosynthesis briefly", True, "truncated"),
+    ("Where is the Eiffel Tower?", True, "ok"),
+    ("What does HTTP stand for?", True, "ok"),
+    ("hi, how are you?", True, "ok"),
+    ("Which planet is the largest?", True, "ok"),
+    ("What is the boiling point of water in Celsius?", True, "ok"),
+    ("quick: convert 5 km to miles", True, "ok"),
+    ("Name three primary colors", True, "ok"),
+    ("How old is the universe?", True, "refusal"),
+    ("Spell 'necessary' backwards", True, "ok"),
+    ("Who painted the Mona Lisa?", True, "ok"),
+    ("What is the square root of 144?", True, "ok"),
+    ("Capital of Japan?", True, "ok"),
+    ("thanks, that helps", True, "empty"),
+    ("What language is spoken in Brazil?", True, "ok"),
+    ("How many days are in a leap year?", True, "ok"),
+    ("What is the chemical symbol for gold?", True, "ok"),
+    ("Who is the CEO of Tesla?", True, "refusal"),
+    ("Give me an antonym of ancient", True, "ok"),
+    ("When is Christmas?", True, "ok"),
+    ("Explain how transformers use attention, with the math behind scaled dot-product attention.", False, "truncated"),
+    ("Compare PostgreSQL and MongoDB for an analytics workload and list the trade-offs.", False, "ok"),
+    ("Write a Python function that merges overlapping intervals and explain its complexity.", False, "truncated"),
+    ("Design the architecture for a multi-tenant chat application with LangGraph agents.", False, "ok"),
+    ("Why did the Roman Empire fall? Give a detailed answer covering economic and military causes.", False, "truncated"),
+    ("Debug this code: def f(x): return x + undefined_var", False, "ok"),
+    ("Prove that the square root of 2 is irrational.", False, "ok"),
+    ("Write an essay on the impact of AI on employment.", False, "truncated"),
+    ("Plan a 7-day itinerary for Japan with a budget breakdown. Include hotels and transport.", False, "truncated"),
+    ("Refactor this class to use dependency injection: class A: def __init__(self): self.db = DB()", False, "ok"),
+    ("Analyze the pros and cons of microservices versus a monolith for a startup.", False, "ok"),
+    ("Explain step by step how to set up an MCP server with streamable HTTP.", False, "truncated"),
+    ("What are the differences between TCP and UDP, and when would you use each? What about QUIC?", False, "ok"),
+    ("Derive the gradient of the softmax cross-entropy loss.", False, "refusal"),
+    ("Optimize this SQL query that joins four tables and aggregates by month.", False, "ok"),
+    ("Summarize the causes of the 2008 financial crisis and explain their interactions in detail.", False, "truncated"),
+    ("Implement an LRU cache in Python with O(1) get and put.", False, "ok"),
+    ("Why is my React component re-rendering on every keystroke? Here is the code: function App() { ... }", False, "ok"),
+    ("Walk me through designing a rate limiter for a public API, with the data structures involved.", False, "truncated"),
+    ("Contrast supervised and reinforcement learning with examples from robotics.", False, "ok"),
+    ("Write a script that watches a folder and uploads new files to S3.", False, "truncated"),
+    ("How should I structure a LangGraph agent that calls three MCP servers? What are the failure modes?", False, "ok"),
+    ("Give me a detailed study plan for learning distributed systems in three months.", False, "truncated"),
+    ("Analyze this stack trace and tell me the root cause: Traceback ... KeyError: 'id'", False, "ok"),
+    ("Explain why Python's GIL limits CPU-bound threads and what the alternatives are.", False, "truncated"),
+    ("Compare three approaches to long-term memory for chat agents and recommend one.", False, "ok"),
+    ("Write a class that parses cron expressions and computes the next run time.", False, "truncated"),
+    ("Design a schema for an e-commerce order system. Explain indexing choices.", False, "ok"),
+    ("Prove that every tree with n nodes has n-1 edges.", False, "ok"),
+    ("Explain the trade-offs between eventual and strong consistency in detail.", False, "truncated"),
+]
+
+# Every third fixture is held out; the weights are fitted on the rest
+TRAIN = [f for n, f in enumerate(FIXTURES) if n % 3 != 2]
+HELD_OUT = [f for n, f in enumerate(FIXTURES) if n % 3 == 2]
+
+
+def fixture_answer(kind: str) -> AIMessage:
+    """Canned small-model answer for a fixture"""
+    if kind == "empty":
+        return AIMessage("")
+    if kind == "truncated":
+        return AIMessage("The first part of a long answer", response_metadata={"finish_reason": "length"})
+    if kind == "refusal":
+        return AIMessage("I'm not sure about that.", response_metadata={"finish_reason": "stop"})
+    return AIMessage("A complete answer.", response_metadata={"finish_reason": "stop"})
+
+
+# Offline cost/latency profile per model (Groq list prices in $ per 1M tokens,
+# typical time-to-first-token in s, output tokens per second)
+PROFILES = {
+    SMALL_MODEL: {"in": 0.05, "out": 0.08, "ttft": 0.15, "tps": 750.0},
+    LARGE_MODEL: {"in": 0.59, "out": 0.79, "ttft": 0.35, "tps": 275.0},
+}
+
+
+def _simulated_call(model: str, prompt_tokens: int, output_tokens: int):
+    profile = PROFILES[model]
+    latency = profile["ttft"] + output_tokens / profile["tps"]
+    cost = (prompt_tokens * profile["in"] + output_tokens * profile["out"]) / 1e6
+    return latency, cost
+
+
+def evaluate(classifier: Callable[[str], float], fixtures=FIXTURES, threshold: float = 0.7) -> Dict[str, Any]:
+    """
+    Route every fixture and price it with PROFILES
+
+    Simple prompts are answered in ~60 output tokens, complex ones in ~600.
+    A prompt sent to the small model whose canned answer fails
+    default_quality_check is escalated, paying for both calls.
+    """
+    baseline_latency = baseline_cost = latency = cost = 0.0
+    correct = escalated = to_small = complex_kept_small = 0
+    for prompt, simple, small_answer in fixtures:
+        prompt_tokens = 40 + len(prompt) // 4
+        output_tokens = 60 if simple else 600
+        base = _simulated_call(LARGE_MODEL, prompt_tokens, output_tokens)
+        baseline_latency += base[0]
+        baseline_cost += base[1]
+
+        routed_small = classifier(prompt) >= threshold
+        correct += routed_small == simple
+        if routed_small:
+            to_small += 1
+            small = _simulated_call(SMALL_MODEL, prompt_tokens, output_tokens)
+            latency += small[0]
+            cost += small[1]
+            if default_quality_check(fixture_answer(small_answer)):
+                complex_kept_small += not simple
+                continue
+            escalated += 1
+        latency += base[0]
+        cost += base[1]
+
+    n = len(fixtures)
+    return {
+        "prompts": n,
+        "routing_accuracy": correct / n,
+        "sent_to_small": to_small,
+        "escalated": escalated,
+        "complex_answered_by_small": complex_kept_small,
+        "latency_saved": 1.0 - latency / baseline_latency,
+        "cost_saved": 1.0 - cost / baseline_cost,
+        "avg_latency_s": latency / n,
+        "avg_latency_baseline_s": baseline_latency / n,
+    }
+
+
+if __name__ == "__main__":
+    classifier = SimplePromptClassifier(weights={}).fit(
+        [prompt for prompt, _, _ in TRAIN], [simple for _, simple, _ in TRAIN]
+    )
+    print("weights fitted on", len(TRAIN), "prompts:",
+          {name: round(value, 2) for name, value in classifier.weights.items()})
+
+    started = time.perf_counter()
+    for prompt, _, _ in FIXTURES:
+        classifier(prompt)
+    per_prompt_us = (time.perf_counter() - started) / len(FIXTURES) * 1e6
+    print(f"classifier cost: {per_prompt_us:.0f} us per prompt")
+
+    for name, fixtures in (("train", TRAIN), ("held-out", HELD_OUT)):
+        print(f"-- {name} split")
+        for key, value in evaluate(classifier, fixtures).items():
+            print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
@@ -0,0 +1,326 @@
+"""
+Record/replay harness for load-testing the agents offline.
+
+Recording:
+    Set CASSETTE_PATH=sessions.jsonl before running one of the chat scripts.
+    CassetteRecorder is a LangChain callback handler, so it captures every
+    LLM request/response and every tool (including MCP tool) call of the
+    session, with their latencies, without touching the model or the tools.
+
+Replaying:
+    ReplayChatModel and replay_tools() serve the recorded responses back,
+    sleeping for the recorded latency times `latency_scale` (0 = no delay).
+    load_test() replays the recorded conversations against create_react_agent
+    or the StateGraph chatbot with N concurrent virtual users.
+
+    python record_replay.py sessions.jsonl --target react --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import ConfigDict, PrivateAttr, create_model
+
+
+def request_key(messages: Sequence[BaseMessage]) -> str:
+    """
+    Stable key for an LLM request.
+
+    Message ids and tool call ids are random per run, so only the role, the
+    content and the tool calls (name + args) are part of the key. System
+    messages are left out: the scripts' `prompt` is not in the cassette, so
+    the replay agent is built without it.
+    """
+    parts = []
+    for message in messages:
+        if message.type == "system":
+            continue
+        calls = [(c["name"], c["args"]) for c in getattr(message, "tool_calls", None) or []]
+        parts.append([message.type, message.content, calls])
+    return json.dumps(parts, sort_keys=True, default=str)
+
+
+def tool_key(name: str, args: Any) -> str:
+    return json.dumps([name, args], sort_keys=True, default=str)
+
+
+class CassetteRecorder(BaseCallbackHandler):
+    """Callback handler that appends LLM, tool and user turns to a JSONL cassette"""
+
+    # Run in the caller's thread/loop, so recorded latencies are not skewed by an executor
+    run_inline = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending: Dict[uuid.UUID, Dict[str, Any]] = {}
+
+    def _write(self, record: Dict[str, Any]):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        # Only the outermost run carries the user's turn
+        if parent_run_id is not None or not isinstance(inputs, dict):
+            return
+        messages = inputs.get("messages") or []
+        if messages:
+            last = messages[-1]
+            content = last.get("content") if isinstance(last, dict) else last.content
+            thread_id = (kwargs.get("metadata") or {}).get("thread_id")
+            self._write({"kind": "turn", "thread_id": thread_id, "content": content})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._pending[run_id] = {
+            "kind": "llm",
+            "request": [message_to_dict(m) for m in messages[0]],
+            "started": time.perf_counter(),
+        }
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        record = self._pending.pop(run_id, None)
+        if record is None:
+            return
+        record["latency"] = time.perf_counter() - record.pop("started")
+        record["response"] = message_to_dict(response.generations[0][0].message)
+        self._write(record)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, inputs=None, **kwargs):
+        self._pending[run_id] = {
+            "kind": "tool",
+            "name": (serialized or {}).get("name") or kwargs.get("name"),
+            "description": (serialized or {}).get("description", ""),
+            "args": inputs if inputs is not None else input_str,
+            "started": time.perf_counter(),
+        }
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        record = self._pending.pop(run_id, None)
+        if record is None:
+            return
+        record["latency"] = time.perf_counter() - record.pop("started")
+        record["output"] = getattr(output, "content", output)
+        self._write(record)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._pending.pop(run_id, None)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._pending.pop(run_id, None)
+
+
+def recording_callbacks() -> List[BaseCallbackHandler]:
+    """[CassetteRecorder] when CASSETTE_PATH is set, otherwise an empty list"""
+    path = os.getenv("CASSETTE_PATH")
+    return [CassetteRecorder(path)] if path else []
+
+
+def load_cassette(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers from a cassette instead of calling a provider"""
+
+    cassette: List[Dict[str, Any]]
+    latency_scale: float = 1.0
+    _responses: Dict[str, list] = PrivateAttr(default_factory=lambda: defaultdict(list))
+    _served: Dict[str, int] = PrivateAttr(default_factory=lambda: defaultdict(int))
+
+    def model_post_init(self, __context: Any):
+        for record in self.cassette:
+            if record["kind"] == "llm":
+                key = request_key(messages_from_dict(record["request"]))
+                self._responses[key].append(record)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool calls are already in the recorded responses
+        return self
+
+    def _lookup(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        key = request_key(messages)
+        recorded = self._responses.get(key)
+        if not recorded:
+            raise ValueError(f"No recorded response for request: {key[:200]}")
+        # Identical requests with different recorded answers are served in turn
+        record = recorded[self._served[key] % len(recorded)]
+        self._served[key] += 1
+        return record
+
+    def _result(self, record: Dict[str, Any]) -> ChatResult:
+        message = messages_from_dict([record["response"]])[0]
+        # Fresh id per replay, the recorded one would collide across threads
+        message.id = None
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        record = self._lookup(messages)
+        time.sleep(record["latency"] * self.latency_scale)
+        return self._result(record)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        record = self._lookup(messages)
+        await asyncio.sleep(record["latency"] * self.latency_scale)
+        return self._result(record)
+
+
+def replay_tools(cassette: List[Dict[str, Any]], latency_scale: float = 1.0) -> List[BaseTool]:
+    """Build one stand-in tool per recorded tool name that serves recorded outputs"""
+    by_name: Dict[str, Dict[str, Any]] = defaultdict(dict)
+    descriptions: Dict[str, str] = {}
+    for record in cassette:
+        if record["kind"] != "tool":
+            continue
+        by_name[record["name"]][tool_key(record["name"], record["args"])] = record
+        descriptions[record["name"]] = record.get("description") or record["name"]
+
+    def make_tool(name: str, recorded: Dict[str, Dict[str, Any]]) -> BaseTool:
+        fallback = next(iter(recorded.values()))
+
+        def pick(kwargs):
+            return recorded.get(tool_key(name, kwargs), fallback)
+
+        def run(**kwargs):
+            record = pick(kwargs)
+            time.sleep(record["latency"] * latency_scale)
+            return record["output"]
+
+        async def arun(**kwargs):
+            record = pick(kwargs)
+            await asyncio.sleep(record["latency"] * latency_scale)
+            return record["output"]
+
+        # Accept whatever arguments the recorded tool calls used
+        schema = create_model(f"{name}_args", __config__=ConfigDict(extra="allow"))
+        return StructuredTool.from_function(
+            func=run, coroutine=arun, name=name,
+            description=descriptions[name], args_schema=schema,
+        )
+
+    return [make_tool(name, recorded) for name, recorded in by_name.items()]
+
+
+def recorded_conversations(cassette: List[Dict[str, Any]]) -> List[List[str]]:
+    """User turns grouped by recorded thread"""
+    threads: Dict[Any, List[str]] = defaultdict(list)
+    for record in cassette:
+        if record["kind"] == "turn":
+            threads[record.get("thread_id")].append(record["content"])
+    return list(threads.values())
+
+
+def build_chatbot_graph(llm, checkpointer=None):
+    """The START -> chatbot -> END graph of 3_chatbot.py / 7_chatbot_langgraph_memory.py"""
+    from typing import Annotated
+    from typing_extensions import TypedDict
+    from langgraph.graph import StateGraph, START, END
+    from langgraph.graph.message import add_messages
+
+    class State(TypedDict):
+        messages: Annotated[list, add_messages]
+
+    async def chatbot(state: State):
+        return {"messages": [await llm.ainvoke(state["messages"])]}
+
+    graph_builder = StateGraph(State)
+    graph_builder.add_node("chatbot", chatbot)
+    graph_builder.add_edge(START, "chatbot")
+    graph_builder.add_edge("chatbot", END)
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+async def load_test(
+    graph,
+    conversations: List[List[str]],
+    concurrency: int,
+    simulated_latency: Optional[float] = None,
+) -> Dict[str, float]:
+    """
+    Replay every conversation `concurrency` times in parallel against `graph`.
+
+    Each virtual user gets its own thread_id. Returns turn latency
+    percentiles and throughput; when `simulated_latency` (the summed recorded
+    latency of one pass over all conversations) is given, also the share of
+    wall time spent outside the replayed model/tool calls.
+    """
+    turn_latencies: List[float] = []
+
+    async def virtual_user(user: int):
+        for n, conversation in enumerate(conversations):
+            config = {"configurable": {"thread_id": f"load-{user}-{n}"}}
+            for content in conversation:
+                started = time.perf_counter()
+                await graph.ainvoke({"messages": [HumanMessage(content=content)]}, config)
+                turn_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(u) for u in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    turn_latencies.sort()
+    report = {
+        "turns": len(turn_latencies),
+        "wall_s": wall,
+        "turns_per_s": len(turn_latencies) / wall if wall else 0.0,
+        "p50_ms": statistics.median(turn_latencies) * 1000,
+        "p95_ms": turn_latencies[int(len(turn_latencies) * 0.95) - 1] * 1000,
+    }
+    if simulated_latency is not None:
+        # Virtual users run in parallel, so one pass is the ideal wall time
+        report["framework_overhead"] = max(0.0, 1.0 - simulated_latency / wall) if wall else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded cassette under load")
+    parser.add_argument("cassette")
+    parser.add_argument("--target", choices=["react", "chatbot"], default="react")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.prebuilt import create_react_agent
+
+    cassette = load_cassette(args.cassette)
+    llm = ReplayChatModel(cassette=cassette, latency_scale=args.latency_scale)
+    if args.target == "react":
+        graph = create_react_agent(
+            llm, replay_tools(cassette, args.latency_scale), checkpointer=InMemorySaver()
+        )
+    else:
+        graph = build_chatbot_graph(llm, checkpointer=InMemorySaver())
+
+    simulated = sum(r.get("latency", 0.0) for r in cassette) * args.latency_scale
+    report = asyncio.run(
+        load_test(graph, recorded_conversations(cassette), args.concurrency, simulated)
+    )
+    for name, value in report.items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Retrieval-based long-term memory for create_react_agent.
+
+Instead of sending the whole checkpointed thread to the model on every turn,
+RetrievalMemory is used as a `pre_model_hook`: it keeps an incremental BM25
+index over the past messages of each thread and hands the model only the
+top-k relevant earlier messages plus a window of the most recent ones.
+The checkpointer still stores the full thread, nothing is deleted.
+
+Usage:
+    memory = RetrievalMemory(top_k=4, window=6)
+    agent = create_react_agent(model, tools=[], checkpointer=checkpointer,
+                               pre_model_hook=memory)
+"""
+
+import math
+import re
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Very common words carry no signal for retrieval and only make postings long
+STOPWORDS = frozenset(
+    "a an and are as at be but by do does for from had has have he her his how i "
+    "if in is it its me my no not of on or our she so that the their them then "
+    "there these they this to was we were what when where which who why will "
+    "with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def message_text(message: BaseMessage) -> str:
+    """Plain text of a message, including text parts of list contents"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    parts = []
+    for item in content:
+        if isinstance(item, str):
+            parts.append(item)
+        elif isinstance(item, dict) and item.get("type") == "text":
+            parts.append(item.get("text", ""))
+    return " ".join(parts)
+
+
+class BM25Index:
+    """
+    Append-only BM25 index over integer document ids.
+
+    Documents are added one at a time (no re-indexing of earlier documents).
+    Postings are kept in compact `array`s and scored with numpy, so a search
+    only touches the postings of the query terms.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        # Terms present in more than this share of documents are ignored at query time
+        self.max_df_ratio = max_df_ratio
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_lengths = array("i")
+        self.n_docs = 0
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def __contains__(self, doc_id: int) -> bool:
+        return 0 <= doc_id < len(self.doc_lengths) and self.doc_lengths[doc_id] >= 0
+
+    def add(self, doc_id: int, text: str):
+        """Index a single document, ids must be added in increasing order"""
+        tokens = tokenize(text)
+        counts: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for token, tf in counts.items():
+            entry = self.postings.get(token)
+            if entry is None:
+                entry = self.postings[token] = (array("i"), array("i"))
+            entry[0].append(doc_id)
+            entry[1].append(tf)
+
+        # Positions that are skipped (not indexed) keep a length of -1
+        while len(self.doc_lengths) < doc_id:
+            self.doc_lengths.append(-1)
+        self.doc_lengths.append(len(tokens))
+        self.n_docs += 1
+        self.total_length += len(tokens)
+
+    def search(self, query: str, k: int, max_doc_id: Optional[int] = None) -> List[int]:
+        """
+        Return up to k document ids ranked by BM25 score.
+
+        Args:
+            query: Free text query
+            k: Number of results
+            max_doc_id: Only consider documents with an id below this value
+        """
+        if not self.n_docs or k <= 0:
+            return []
+
+        n_docs = self.n_docs
+        max_df = max(1, int(n_docs * self.max_df_ratio))
+        avg_length = self.total_length / n_docs or 1.0
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.int32)
+        scores = None
+
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            df = len(entry[0])
+            if df > max_df and n_docs > 20:
+                continue
+            ids = np.frombuffer(entry[0], dtype=np.int32)
+            tfs = np.frombuffer(entry[1], dtype=np.int32).astype(np.float64)
+            if max_doc_id is not None:
+                # ids are increasing, so the cut-off is a single bisection
+                cut = int(np.searchsorted(ids, max_doc_id))
+                ids, tfs = ids[:cut], tfs[:cut]
+                if not len(ids):
+                    continue
+            idf = math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[ids] / avg_length)
+            if scores is None:
+                scores = np.zeros(len(doc_lengths))
+            scores[ids] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        if scores is None:
+            return []
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+        return [int(i) for i in hits[np.argsort(-scores[hits], kind="stable")]]
+
+
+class RetrievalMemory:
+    """
+    pre_model_hook that builds the model input from retrieved + recent messages.
+
+    Args:
+        top_k: Number of earlier messages to retrieve per turn
+        window: Number of most recent messages that are always sent
+    """
+
+    def __init__(self, top_k: int = 4, window: int = 6):
+        self.top_k = top_k
+        self.window = window
+        # thread_id -> (index, number of messages already indexed)
+        self._threads: Dict[str, list] = {}
+
+    def _index_for(self, thread_id: str, messages: List[BaseMessage]) -> BM25Index:
+        entry = self._threads.get(thread_id)
+        if entry is None or entry[1] > len(messages):
+            # New thread, or the thread was rewritten: start over
+            entry = [BM25Index(), 0]
+            self._threads[thread_id] = entry
+
+        index, indexed = entry
+        for position in range(indexed, len(messages)):
+            message = messages[position]
+            # Tool traffic is not indexed, it can't be replayed without its call
+            if isinstance(message, HumanMessage) or (
+                isinstance(message, AIMessage) and not message.tool_calls
+            ):
+                index.add(position, message_text(message))
+        entry[1] = len(messages)
+        return index
+
+    def select(self, thread_id: str, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Pick the messages the model should see for this turn"""
+        index = self._index_for(thread_id, messages)
+
+        start = max(0, len(messages) - self.window)
+        # Never start the window on a tool result, its AI tool call must come first
+        while start > 0 and getattr(messages[start], "type", None) == "tool":
+            start -= 1
+        if start == 0:
+            return list(messages)
+
+        query = ""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                query = message_text(message)
+                break
+
+        selected = set()
+        for position in index.search(query, self.top_k, max_doc_id=start):
+            selected.add(position)
+            # Keep question/answer pairs together
+            if isinstance(messages[position], HumanMessage):
+                partner = position + 1
+            else:
+                partner = position - 1
+            if 0 <= partner < start and partner in index:
+                selected.add(partner)
+
+        return [messages[p] for p in sorted(selected)] + list(messages[start:])
+
+    def __call__(self, state: Dict[str, Any], config: Optional[RunnableConfig] = None):
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id", "default")
+        return {"llm_input_messages": self.select(str(thread_id), state["messages"])}
+
+
+if __name__ == "__main__":
+    # Retrieval latency benchmark over synthetic turns
+    import random
+    import time
+
+    random.seed(0)
+    # Zipf-distributed vocabulary, closer to real chat text than uniform words
+    vocabulary = [f"word{i}" for i in range(20000)]
+    weights = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+    index = BM25Index()
+    n_turns = 100_000
+    for doc_id in range(n_turns):
+        index.add(doc_id, " ".join(random.choices(vocabulary, weights, k=random.randint(8, 40))))
+
+    queries = [" ".join(random.choices(vocabulary, weights, k=12)) for _ in range(200)]
+    started = time.perf_counter()
+    for query in queries:
+        index.search(query, k=4)
+    elapsed = (time.perf_counter() - started) / len(queries)
+    print(f"{n_turns} turns indexed, avg search latency: {elapsed * 1000:.3f} ms")
@@ -0,0 +1,136 @@
+"""
+Delta-based console rendering for agent streams.
+
+stream_mode="values" re-emits the whole state after every step, so printing
+it costs more with every step and dumps full tool payloads each time.
+render_stream() consumes "messages" (token chunks) and "updates" (per-node
+deltas) instead: model text and thinking are printed as they arrive, tool
+calls and tool results are summarized in one line each.
+
+Shared by the MCP chat loops:
+
+    structured = await render_stream(agent, {"messages": [input_message]}, config)
+"""
+
+import json
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+# Nodes whose model output is not meant for the console
+_HIDDEN_NODES = {"generate_structured_response"}
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def summarize_tool_message(message: ToolMessage, limit: int = 160) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    status = " (error)" if getattr(message, "status", None) == "error" else ""
+    return f"[tool {message.name}{status}] {len(content)} chars: {_shorten(content, limit)}"
+
+
+class StreamRenderer:
+    """
+    Prints only the new content of a stream
+
+    Args:
+        out: Where to write, defaults to stdout
+        show_thinking: Print thinking parts of the model output
+        preview: Characters of tool arguments/results to show
+    """
+
+    def __init__(self, out: Optional[TextIO] = None, show_thinking: bool = True, preview: int = 160):
+        self.out = out or sys.stdout
+        self.show_thinking = show_thinking
+        self.preview = preview
+        self._section: Optional[tuple] = None
+        self._streamed_ids = set()
+        self.structured_response: Any = None
+
+    def _write(self, message_id: Optional[str], kind: str, text: str):
+        if not text:
+            return
+        section = (message_id, kind)
+        if section != self._section:
+            if self._section is not None:
+                self.out.write("\n")
+            self.out.write("Thinking: " if kind == "thinking" else "Assistant: ")
+            self._section = section
+        self.out.write(text)
+        self.out.flush()
+
+    def _line(self, text: str):
+        if self._section is not None:
+            self.out.write("\n")
+            self._section = None
+        self.out.write(text + "\n")
+        self.out.flush()
+
+    def on_message(self, message, metadata: Dict[str, Any]):
+        """Handle one item of stream_mode="messages" """
+        if metadata.get("langgraph_node") in _HIDDEN_NODES:
+            return
+        if isinstance(message, ToolMessage):
+            self._line(summarize_tool_message(message, self.preview))
+            return
+        if not isinstance(message, AIMessage):
+            return
+
+        # A complete (non-chunk) message repeats what was already streamed
+        if message.id in self._streamed_ids and message.type == "ai":
+            return
+        if message.type == "AIMessageChunk":
+            self._streamed_ids.add(message.id)
+
+        content = message.content
+        if isinstance(content, str):
+            self._write(message.id, "text", content)
+            return
+        for item in content:
+            if isinstance(item, str):
+                self._write(message.id, "text", item)
+            elif isinstance(item, dict):
+                if item.get("type") == "thinking" and self.show_thinking:
+                    self._write(message.id, "thinking", item.get("thinking", ""))
+                elif item.get("type") == "text":
+                    self._write(message.id, "text", item.get("text", ""))
+
+    def on_update(self, update: Dict[str, Any]):
+        """Handle one item of stream_mode="updates" """
+        for node_output in update.values():
+            if not isinstance(node_output, dict):
+                continue
+            if "structured_response" in node_output:
+                self.structured_response = node_output["structured_response"]
+            for message in node_output.get("messages") or []:
+                for call in getattr(message, "tool_calls", None) or []:
+                    args = _shorten(json.dumps(call["args"], default=str), self.preview)
+                    self._line(f"[call {call['name']}] {args}")
+
+    def finish(self):
+        if self._section is not None:
+            self.out.write("\n")
+            self.out.flush()
+            self._section = None
+
+
+async def render_stream(agent, inputs: Dict[str, Any], config: Dict[str, Any], **options) -> Any:
+    """
+    Stream one agent turn to the console
+
+    Returns the structured response of the turn, if the agent produced one.
+    """
+    renderer = StreamRenderer(**options)
+    async for mode, item in agent.astream(inputs, config=config, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            renderer.on_message(*item)
+        else:
+            renderer.on_update(item)
+    renderer.finish()
+    return renderer.structured_response
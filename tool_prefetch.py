@@ -0,0 +1,343 @@
+"""
+Speculative tool prefetching for the Elasticsearch log agent.
+
+A log question normally costs an LLM round trip, then the search, then a
+second LLM round trip. Most follow-ups have a predictable shape (recent
+errors, counts by level, the last N logs), so SpeculativeToolPrefetcher
+predicts the search calls a question will need and starts them while the
+first LLM call is still running. When the agent then issues a call with the
+same tool name and arguments, it is served from the prefetched result.
+
+Predictions come from intent rules over the user input. Once an intent has
+been seen, the arguments the agent actually used for it replace the rule's
+template, so repeated question shapes hit even when the model words its
+query differently from the template.
+
+Unused prefetches are cancelled at the end of the turn and counted as
+wasted. When the wasted calls of the last `window` turns reach
+`waste_budget`, prefetching pauses until older turns age out of the window.
+
+    prefetcher = SpeculativeToolPrefetcher(client.servers["elasticsearch-mcp-server"])
+    tools = await prefetcher.get_tools()
+    ...
+    prefetcher.start_turn(user_input)
+    await render_stream(agent, inputs, config)
+    prefetcher.end_turn()
+
+    python tool_prefetch.py   # hit rate and latency saved against a local stub server
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+
+
+def _recent(size: int) -> Dict[str, Any]:
+    return {"query": {"match_all": {}}, "sort": [{"@timestamp": {"order": "desc"}}], "size": size}
+
+
+def _errors(size: int) -> Dict[str, Any]:
+    return {"query": {"match": {"level": "ERROR"}}, "sort": [{"@timestamp": {"order": "desc"}}], "size": size}
+
+
+def _count_by_level() -> Dict[str, Any]:
+    return {"size": 0, "aggs": {"by_level": {"terms": {"field": "level"}}}}
+
+
+# (intent, pattern, match -> (intent key, query body)). The key separates
+# variants of an intent, e.g. "last 5 logs" and "last 50 logs"
+Rule = Tuple[str, "re.Pattern", Callable[["re.Match"], Tuple[str, Dict[str, Any]]]]
+
+DEFAULT_RULES: List[Rule] = [
+    ("errors", re.compile(r"\b(errors?|fail(ed|ures?|ing)?|exceptions?)\b", re.I),
+     lambda m: ("errors", _errors(10))),
+    ("count_by_level", re.compile(r"\b(count|how many|breakdown|by level|per level)\b", re.I),
+     lambda m: ("count_by_level", _count_by_level())),
+    ("recent", re.compile(r"\b(last|latest|recent|newest)\s+(\d+)?", re.I),
+     lambda m: (f"recent:{m.group(2) or 10}", _recent(int(m.group(2) or 10)))),
+]
+
+# Argument names used for the index and the query body by common Elasticsearch MCP servers
+_INDEX_ARGS = ("index", "index_name")
+_BODY_ARGS = ("body", "query_body", "query")
+
+
+def call_key(name: str, arguments: Optional[Dict[str, Any]]) -> str:
+    return name + json.dumps(arguments or {}, sort_keys=True, default=str)
+
+
+class _Prefetch:
+    __slots__ = ("intent", "name", "arguments", "task", "started", "finished")
+
+    def __init__(self, intent, name, arguments, task):
+        self.intent = intent
+        self.name = name
+        self.arguments = arguments
+        self.task = task
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+
+class SpeculativeToolPrefetcher:
+    """
+    Wraps a session-like object (anything with `call_tool(name, arguments)`)
+    and serves matching calls from prefetched results
+
+    Args:
+        server: MCP session or PooledMCPServer the calls go to
+        index: Index the rule templates search
+        rules: Intent rules, see DEFAULT_RULES
+        max_prefetch: Calls started per turn at most
+        waste_budget: Wasted calls allowed over the last `window` turns
+        window: Turns the waste budget is counted over
+        max_age: Seconds a prefetched result stays servable
+    """
+
+    def __init__(
+        self,
+        server: Any,
+        index: str = "logs-*",
+        rules: Optional[List[Rule]] = None,
+        max_prefetch: int = 2,
+        waste_budget: int = 4,
+        window: int = 10,
+        max_age: float = 30.0,
+    ):
+        self.server = server
+        self.index = index
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.max_prefetch = max_prefetch
+        self.waste_budget = waste_budget
+        self.max_age = max_age
+        self._search: Optional[Tuple[str, str, str]] = None  # tool, index arg, body arg
+        self._pending: Dict[str, _Prefetch] = {}
+        self._in_turn = False
+        self._intents: List[str] = []
+        self._turn_calls: List[Tuple[str, Dict[str, Any]]] = []
+        self._turn_wasted = 0  # matched prefetches that failed or went stale this turn
+        # intent key -> searches the agent made the last time the intent was predicted alone
+        self._learned: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        self._wasted_per_turn: Deque[int] = deque(maxlen=window)
+
+        self.prefetched = 0
+        self.hits = 0
+        self.wasted = 0
+        self.calls = 0
+        self.skipped_over_budget = 0
+        self.latency_saved = 0.0
+
+    async def get_tools(self) -> List[BaseTool]:
+        """Server tools converted so that their calls go through the prefetcher"""
+        mcp_tools = await self.server.list_tools()
+        for tool in mcp_tools:
+            properties = (tool.inputSchema or {}).get("properties", {})
+            index_arg = next((a for a in _INDEX_ARGS if a in properties), None)
+            body_arg = next((a for a in _BODY_ARGS if a in properties), None)
+            if "search" in tool.name and index_arg and body_arg:
+                self._search = (tool.name, index_arg, body_arg)
+                break
+        return [convert_mcp_tool_to_langchain_tool(self, tool) for tool in mcp_tools]
+
+    def predict(self, text: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(intent key, tool name, arguments) for the calls `text` is likely to need"""
+        predictions = []
+        for _, pattern, build in self.rules:
+            match = pattern.search(text)
+            if not match:
+                continue
+            key, body = build(match)
+            if key in self._learned:
+                predictions.extend((key, name, args) for name, args in self._learned[key])
+            elif self._search:
+                name, index_arg, body_arg = self._search
+                predictions.append((key, name, {index_arg: self.index, body_arg: body}))
+        return predictions
+
+    def _allowance(self) -> int:
+        return max(0, min(self.max_prefetch, self.waste_budget - sum(self._wasted_per_turn)))
+
+    def start_turn(self, text: str):
+        """Start the predicted calls for a user message; call from the running event loop"""
+        self.end_turn()
+        self._in_turn = True
+        allowance = self._allowance()
+        for intent, name, arguments in self.predict(text):
+            if intent not in self._intents:
+                self._intents.append(intent)
+            key = call_key(name, arguments)
+            if key in self._pending:
+                continue
+            if allowance == 0:
+                self.skipped_over_budget += 1
+                continue
+            allowance -= 1
+            task = asyncio.ensure_future(self.server.call_tool(name, arguments))
+            prefetch = _Prefetch(intent, name, arguments, task)
+            task.add_done_callback(lambda _, p=prefetch: setattr(p, "finished", time.perf_counter()))
+            self._pending[key] = prefetch
+            self.prefetched += 1
+
+    def end_turn(self):
+        """Cancel unused prefetches and learn the searches made for this turn's intent"""
+        unused = len(self._pending)
+        for prefetch in self._pending.values():
+            prefetch.task.cancel()
+        self._pending.clear()
+        self.wasted += unused
+        if self._in_turn:
+            self._wasted_per_turn.append(unused + self._turn_wasted)
+        self._turn_wasted = 0
+        # Only read-only searches are replayed, and only when the turn had a
+        # single intent; otherwise the calls can't be told apart per intent
+        searches = [call for call in self._turn_calls if self._search and call[0] == self._search[0]]
+        if searches and len(self._intents) == 1:
+            self._learned[self._intents[0]] = searches
+        self._in_turn = False
+        self._intents = []
+        self._turn_calls = []
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        """Same signature as ClientSession.call_tool"""
+        self.calls += 1
+        self._turn_calls.append((name, arguments or {}))
+        prefetch = self._pending.pop(call_key(name, arguments), None)
+        if prefetch is not None and time.perf_counter() - prefetch.started <= self.max_age:
+            requested = time.perf_counter()
+            try:
+                result = await prefetch.task
+            except Exception:
+                result = None  # failed prefetch, fall back to a real call
+            if result is not None and not getattr(result, "isError", False):
+                self.hits += 1
+                # Time the call would have taken minus the time actually waited
+                self.latency_saved += max(0.0, (prefetch.finished or requested) - prefetch.started
+                                          - (time.perf_counter() - requested))
+                return result
+            self.wasted += 1
+            self._turn_wasted += 1
+        elif prefetch is not None:
+            prefetch.task.cancel()
+            self.wasted += 1
+            self._turn_wasted += 1
+        return await self.server.call_tool(name, arguments)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "tool_calls": self.calls,
+            "prefetched": self.prefetched,
+            "hits": self.hits,
+            "wasted": self.wasted,
+            "skipped_over_budget": self.skipped_over_budget,
+            "hit_rate": self.hits / self.prefetched if self.prefetched else 0.0,
+            "calls_served": self.hits / self.calls if self.calls else 0.0,
+            "latency_saved_s": self.latency_saved,
+        }
+
+
+if __name__ == "__main__":
+    # Scripted log questions against a local stub MCP server, with a fake LLM
+    # of fixed latency that issues the search calls a real model would
+    import logging
+    import socket
+    import threading
+
+    import uvicorn
+    from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+    from langchain_core.messages import AIMessage
+    from langgraph.prebuilt import create_react_agent
+    from mcp.server.fastmcp import FastMCP
+
+    from mcp_pool import PooledMCPClient
+
+    LLM_LATENCY = 0.4
+    SEARCH_LATENCY = 0.3
+
+    stub = FastMCP("stub-elasticsearch", log_level="WARNING")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    @stub.tool()
+    async def list_indices() -> str:
+        """List indices"""
+        return "logs-app"
+
+    @stub.tool()
+    async def search(index: str, query_body: dict) -> str:
+        """Search an index with a query DSL body"""
+        await asyncio.sleep(SEARCH_LATENCY)
+        return f"{index}: 3 hits for {json.dumps(query_body, sort_keys=True)}"
+
+    def searching(body):
+        return {"index": "logs-*", "query_body": body}
+
+    # (question, search bodies the model uses); the model writes some queries
+    # differently from the rule templates, and one question is unpredictable
+    SCRIPT = [
+        ("show me recent errors", [_errors(20)]),
+        ("how many logs per level?", [_count_by_level()]),
+        ("last 5 logs", [_recent(5)]),
+        ("any new errors?", [_errors(20)]),
+        ("which hosts had disk warnings?", [{"query": {"match": {"message": "disk"}}, "size": 10}]),
+        ("count by level again", [_count_by_level()]),
+        ("last 5 logs please", [_recent(5)]),
+        ("errors in the last hour?", [_errors(20), _recent(10)]),
+        ("show the failures again", [_errors(20)]),
+        ("last 20 logs", [_recent(20)]),
+    ]
+
+    class ScriptedModel(FakeMessagesListChatModel):
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+    def scripted_model():
+        responses = []
+        for n, (_, bodies) in enumerate(SCRIPT):
+            calls = [{"name": "search", "args": searching(body), "id": f"call_{n}_{i}"}
+                     for i, body in enumerate(bodies)]
+            responses.append(AIMessage(content="", tool_calls=calls))
+            responses.append(AIMessage(content=f"answer {n}"))
+        return ScriptedModel(responses=responses, sleep=LLM_LATENCY)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        stub.streamable_http_app(), host="127.0.0.1", port=port, log_level="error"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def run(prefetch: bool) -> Tuple[List[float], Optional[SpeculativeToolPrefetcher]]:
+        connection = {"url": f"http://127.0.0.1:{port}/mcp", "transport": "streamable_http"}
+        async with PooledMCPClient({"stub": connection}) as client:
+            prefetcher = SpeculativeToolPrefetcher(client.servers["stub"]) if prefetch else None
+            tools = await (prefetcher.get_tools() if prefetcher else client.get_tools())
+            agent = create_react_agent(scripted_model(), tools)
+            timings = []
+            for question, _ in SCRIPT:
+                started = time.perf_counter()
+                if prefetcher:
+                    prefetcher.start_turn(question)
+                await agent.ainvoke({"messages": [{"role": "user", "content": question}]})
+                if prefetcher:
+                    prefetcher.end_turn()
+                timings.append(time.perf_counter() - started)
+            return timings, prefetcher
+
+    async def main():
+        baseline, _ = await run(prefetch=False)
+        timings, prefetcher = await run(prefetch=True)
+        print(f"{len(SCRIPT)} questions, LLM {LLM_LATENCY * 1000:.0f} ms, search {SEARCH_LATENCY * 1000:.0f} ms")
+        print(f"avg turn without prefetch: {sum(baseline) / len(baseline) * 1000:.0f} ms")
+        print(f"avg turn with prefetch:    {sum(timings) / len(timings) * 1000:.0f} ms")
+        for name, value in prefetcher.stats().items():
+            print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+    asyncio.run(main())
+    server.should_exit = True
@@ -0,0 +1,306 @@
+"""
+Per-turn tool selection for agents with many MCP tools.
+
+The GitHub and filesystem MCP servers expose dozens of tools, and every
+model call carries all of their JSON schemas. ToolSelector keeps a BM25
+index over tool names, descriptions and argument names and binds only the
+top-k tools for the latest user message, plus the tools called in the
+last few turns of the thread (follow-ups like "now merge it" rarely name
+the tool again). The full tool list still goes to create_react_agent, so
+the tool node can run anything the model calls.
+
+    selector = ToolSelector(llm, tools, k=8)
+    agent = create_react_agent(selector, tools, checkpointer=...)
+
+    python tool_selector.py   # recall on fixtures, prompt tokens and latency saved
+"""
+
+import json
+import re
+from typing import Any, Dict, FrozenSet, List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from retrieval_memory import BM25Index, message_text, tokenize
+
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+# Shorthand users type for words that appear in tool descriptions
+ALIASES = {
+    "pr": "pull request",
+    "prs": "pull requests",
+    "repo": "repository",
+    "repos": "repositories",
+    "dir": "directory",
+    "folder": "directory",
+    "folders": "directories",
+    "ls": "list directory",
+    "mkdir": "create directory",
+    "rename": "move",
+    "bug": "issue",
+    "bugs": "issues",
+    "ticket": "issue",
+    "show": "get read list",
+}
+
+
+def _words(text: str) -> str:
+    return _CAMEL.sub(" ", text).replace("_", " ").replace("-", " ")
+
+
+def _normalize(text: str) -> str:
+    # Alias expansion and plural folding, applied to tools and queries alike
+    tokens = []
+    for token in tokenize(_words(text)):
+        for word in ALIASES.get(token, token).split():
+            tokens.append(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word)
+    return " ".join(tokens)
+
+
+def tool_text(tool: BaseTool) -> str:
+    """Indexed text of a tool: its name (twice, as a boost), description and argument names"""
+    arguments = " ".join((tool.args or {}).keys())
+    return _normalize(f"{tool.name} {tool.name} {tool.description} {arguments}")
+
+
+def schema_tokens(tools: Sequence[BaseTool]) -> int:
+    """Rough prompt tokens (~4 characters per token) of the serialized tool schemas"""
+    return sum(len(json.dumps(convert_to_openai_tool(tool))) for tool in tools) // 4
+
+
+class ToolSelector:
+    """
+    Dynamic model for create_react_agent that binds a per-turn subset of tools
+
+    Args:
+        llm: Chat model to bind the selected tools to
+        tools: All tools the agent can run
+        k: Tools picked by relevance to the latest user message
+        recent_turns: Tools called in this many latest turns stay bound
+        always: Names of tools that are always bound
+    """
+
+    def __init__(self, llm, tools: Sequence[BaseTool], k: int = 8, recent_turns: int = 2,
+                 always: Sequence[str] = ()):
+        self.llm = llm
+        self.tools = list(tools)
+        self.k = k
+        self.recent_turns = recent_turns
+        self.always = set(always)
+        self._positions = {tool.name: n for n, tool in enumerate(self.tools)}
+        self._tokens = {tool.name: schema_tokens([tool]) for tool in self.tools}
+        self._all_tokens = sum(self._tokens.values())
+        self._index = BM25Index(max_df_ratio=0.5)
+        for n, tool in enumerate(self.tools):
+            self._index.add(n, tool_text(tool))
+        # Bound models by tool subset; binding converts every schema again
+        self._bound: Dict[FrozenSet[str], Runnable] = {}
+
+        self.calls = 0
+        self.tools_bound = 0
+        self.schema_tokens_saved = 0
+
+    def recent_tools(self, messages: Sequence[BaseMessage]) -> List[str]:
+        names, turns = [], 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                turns += 1
+                if turns > self.recent_turns:
+                    break
+            elif isinstance(message, AIMessage):
+                names.extend(call["name"] for call in message.tool_calls)
+        return names
+
+    def select(self, messages: Sequence[BaseMessage]) -> List[BaseTool]:
+        """Tools to bind for the next model call, in their original order"""
+        query = next((message_text(m) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        names = set(self.always)
+        names.update(name for name in self.recent_tools(messages) if name in self._positions)
+        names.update(self.tools[n].name for n in self._index.search(_normalize(query), self.k))
+        return [self.tools[n] for n in sorted(self._positions[name] for name in names)]
+
+    def __call__(self, state: Dict[str, Any], runtime: Any = None) -> Runnable:
+        messages = state["messages"] if isinstance(state, dict) else state.messages
+        selected = self.select(messages)
+        key = frozenset(tool.name for tool in selected)
+        bound = self._bound.get(key)
+        if bound is None:
+            bound = self._bound[key] = self.llm.bind_tools(selected)
+            if len(self._bound) > 256:
+                self._bound.pop(next(iter(self._bound)))
+
+        self.calls += 1
+        self.tools_bound += len(selected)
+        self.schema_tokens_saved += self._all_tokens - sum(self._tokens[tool.name] for tool in selected)
+        return bound
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "model_calls": self.calls,
+            "tools_total": len(self.tools),
+            "avg_tools_bound": self.tools_bound / self.calls if self.calls else 0.0,
+            "schema_tokens_saved": self.schema_tokens_saved,
+        }
+
+
+if __name__ == "__main__":
+    # Offline fixtures: the tool names/descriptions of @modelcontextprotocol/server-github
+    # and server-filesystem, labeled user requests, and a fake LLM whose latency grows
+    # with the prompt size
+    import asyncio
+    import time
+
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langchain_core.tools import StructuredTool
+    from langgraph.prebuilt import create_react_agent
+
+    FIRST_TOKEN = 0.15
+    PREFILL_PER_TOKEN = 0.0001  # 10k prompt tokens/s
+
+    S, I, B, A = "string", "integer", "boolean", "array"
+    REPO = {"owner": S, "repo": S}
+    SERVER_TOOLS = [
+        ("create_or_update_file", "Create or update a single file in a GitHub repository", {**REPO, "path": S, "content": S, "message": S, "branch": S, "sha": S}),
+        ("search_repositories", "Search for GitHub repositories", {"query": S, "page": I, "perPage": I}),
+        ("create_repository", "Create a new GitHub repository in your account", {"name": S, "description": S, "private": B, "autoInit": B}),
+        ("get_file_contents", "Get the contents of a file or directory from a GitHub repository", {**REPO, "path": S, "branch": S}),
+        ("push_files", "Push multiple files to a GitHub repository in a single commit", {**REPO, "branch": S, "files": A, "message": S}),
+        ("create_issue", "Create a new issue in a GitHub repository", {**REPO, "title": S, "body": S, "assignees": A, "labels": A}),
+        ("create_pull_request", "Create a new pull request in a GitHub repository", {**REPO, "title": S, "body": S, "head": S, "base": S, "draft": B}),
+        ("fork_repository", "Fork a GitHub repository to your account or specified organization", {**REPO, "organization": S}),
+        ("create_branch", "Create a new branch in a GitHub repository", {**REPO, "branch": S, "from_branch": S}),
+        ("list_commits", "Get list of commits of a branch in a GitHub repository", {**REPO, "sha": S, "page": I, "perPage": I}),
+        ("list_issues", "List issues in a GitHub repository with filtering options", {**REPO, "state": S, "labels": A, "sort": S, "since": S}),
+        ("update_issue", "Update an existing issue in a GitHub repository", {**REPO, "issue_number": I, "title": S, "body": S, "state": S}),
+        ("add_issue_comment", "Add a comment to an existing issue", {**REPO, "issue_number": I, "body": S}),
+        ("search_code", "Search for code across GitHub repositories", {"q": S, "order": S, "page": I}),
+        ("search_issues", "Search for issues and pull requests across GitHub repositories", {"q": S, "sort": S, "order": S}),
+        ("search_users", "Search for users on GitHub", {"q": S, "sort": S, "order": S}),
+        ("get_issue", "Get details of a specific issue in a GitHub repository", {**REPO, "issue_number": I}),
+        ("get_pull_request", "Get details of a specific pull request", {**REPO, "pull_number": I}),
+        ("list_pull_requests", "List and filter repository pull requests", {**REPO, "state": S, "head": S, "base": S, "sort": S}),
+        ("create_pull_request_review", "Create a review on a pull request", {**REPO, "pull_number": I, "body": S, "event": S, "comments": A}),
+        ("merge_pull_request", "Merge a pull request", {**REPO, "pull_number": I, "commit_title": S, "merge_method": S}),
+        ("get_pull_request_files", "Get the list of files changed in a pull request", {**REPO, "pull_number": I}),
+        ("get_pull_request_status", "Get the combined status of all status checks for a pull request", {**REPO, "pull_number": I}),
+        ("update_pull_request_branch", "Update a pull request branch with the latest changes from the base branch", {**REPO, "pull_number": I, "expected_head_sha": S}),
+        ("get_pull_request_comments", "Get the review comments on a pull request", {**REPO, "pull_number": I}),
+        ("get_pull_request_reviews", "Get the reviews on a pull request", {**REPO, "pull_number": I}),
+        ("read_file", "Read the complete contents of a file from the file system", {"path": S}),
+        ("read_multiple_files", "Read the contents of multiple files simultaneously", {"paths": A}),
+        ("write_file", "Create a new file or completely overwrite an existing file with new content", {"path": S, "content": S}),
+        ("edit_file", "Make line-based edits to a text file, returns a git-style diff", {"path": S, "edits": A, "dryRun": B}),
+        ("create_directory", "Create a new directory or ensure a directory exists", {"path": S}),
+        ("list_directory", "Get a detailed listing of all files and directories in a specified path", {"path": S}),
+        ("directory_tree", "Get a recursive tree view of files and directories as a JSON structure", {"path": S}),
+        ("move_file", "Move or rename files and directories", {"source": S, "destination": S}),
+        ("search_files", "Recursively search for files and directories matching a pattern", {"path": S, "pattern": S, "excludePatterns": A}),
+        ("get_file_info", "Retrieve detailed metadata about a file or directory: size, times, permissions", {"path": S}),
+        ("list_allowed_directories", "Returns the list of directories this server is allowed to access", {}),
+    ]
+
+    def fixture_tool(name, description, arguments):
+        schema = {
+            "type": "object",
+            "properties": {arg: {"type": kind, "description": arg.replace("_", " ")} for arg, kind in arguments.items()},
+            "required": list(arguments)[:2],
+        }
+        return StructuredTool(name=name, description=description, args_schema=schema, func=lambda **_: "ok")
+
+    TOOLS = [fixture_tool(*spec) for spec in SERVER_TOOLS]
+
+    # (request, tools it needs)
+    FIXTURES = [
+        ("Create an issue in sinha-mohit/LangGraph_Agent about the broken streamlit sidebar", {"create_issue"}),
+        ("List the open pull requests on my LangGraph_Agent repo", {"list_pull_requests"}),
+        ("Merge PR 12", {"merge_pull_request"}),
+        ("What files did pull request 7 change?", {"get_pull_request_files"}),
+        ("Are the checks passing on PR 7?", {"get_pull_request_status"}),
+        ("Show me the last commits on main", {"list_commits"}),
+        ("Fork langchain-ai/langgraph into my account", {"fork_repository"}),
+        ("Create a branch called feature/tools from main", {"create_branch"}),
+        ("Search GitHub for repositories about MCP servers", {"search_repositories"}),
+        ("Find code that calls create_react_agent on GitHub", {"search_code"}),
+        ("Comment on issue 3 that it is fixed", {"add_issue_comment"}),
+        ("Close issue 5", {"update_issue"}),
+        ("Read the README.md file", {"read_file"}),
+        ("What is in the folder ./docs?", {"list_directory"}),
+        ("Show me the directory tree of the project", {"directory_tree"}),
+        ("Rename notes.txt to notes.md", {"move_file"}),
+        ("Make a new folder called outputs", {"create_directory"}),
+        ("Write a file hello.py that prints hello", {"write_file"}),
+        ("Find all .py files under src", {"search_files"}),
+        ("Read requirements.txt and 3_chatbot.py", {"read_multiple_files", "read_file"}),
+        ("Push hello.py and README.md to the repo in one commit", {"push_files"}),
+        ("Open a pull request from feature/tools into main", {"create_pull_request"}),
+        ("Get the contents of src/app.py from the GitHub repo", {"get_file_contents"}),
+        ("Approve pull request 9 with a review", {"create_pull_request_review"}),
+        ("How big is the file graph.png and when was it modified?", {"get_file_info"}),
+    ]
+    # Follow-ups that only work with the tools of the previous turn kept bound
+    FOLLOW_UPS = [
+        ("What files did pull request 7 change?", "get_pull_request_files", "and for number 8?"),
+        ("Read the README.md file", "read_file", "same for CHANGELOG"),
+        ("Close issue 5", "update_issue", "also 6 and 7"),
+    ]
+
+    def covered(needed, selected) -> float:
+        names = {tool.name for tool in selected}
+        # Either of the read tools is enough for the two-file request
+        if needed == {"read_multiple_files", "read_file"}:
+            return float(bool(needed & names))
+        return len(needed & names) / len(needed)
+
+    class PrefillChatModel(BaseChatModel):
+        """Fake LLM: latency = first token + prefill time of the bound tool schemas and messages"""
+
+        bound: list = []
+
+        @property
+        def _llm_type(self) -> str:
+            return "prefill-fake"
+
+        def bind_tools(self, tools, **kwargs):
+            return self.model_copy(update={"bound": list(tools)})
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt_tokens = schema_tokens(self.bound) + sum(len(message_text(m)) for m in messages) // 4
+            time.sleep(FIRST_TOKEN + prompt_tokens * PREFILL_PER_TOKEN)
+            message = AIMessage("done", usage_metadata={"input_tokens": prompt_tokens, "output_tokens": 1,
+                                                        "total_tokens": prompt_tokens + 1})
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    for k in (4, 8):
+        selector = ToolSelector(PrefillChatModel(), TOOLS, k=k)
+        recall = sum(covered(needed, selector.select([HumanMessage(q)])) for q, needed in FIXTURES) / len(FIXTURES)
+
+        follow_up_hits = 0
+        for first, used, follow_up in FOLLOW_UPS:
+            history = [HumanMessage(first), AIMessage("", tool_calls=[{"name": used, "args": {}, "id": "1"}]),
+                       AIMessage("done"), HumanMessage(follow_up)]
+            follow_up_hits += used in {tool.name for tool in selector.select(history)}
+        print(f"k={k}: recall {recall:.3f} on {len(FIXTURES)} requests, "
+              f"follow-ups keeping the previous tool {follow_up_hits}/{len(FOLLOW_UPS)}")
+
+    async def drive(model) -> float:
+        agent = create_react_agent(model, TOOLS)
+        started = time.perf_counter()
+        for question, _ in FIXTURES:
+            await agent.ainvoke({"messages": [{"role": "user", "content": question}]})
+        return (time.perf_counter() - started) / len(FIXTURES)
+
+    all_tokens = schema_tokens(TOOLS)
+    selector = ToolSelector(PrefillChatModel(), TOOLS, k=8)
+    baseline = asyncio.run(drive(PrefillChatModel()))
+    selected = asyncio.run(drive(selector))
+    stats = selector.stats()
+    print(f"{len(TOOLS)} tools, {all_tokens} schema tokens per call without selection")
+    print(f"k=8: {stats['avg_tools_bound']:.1f} tools bound per call, "
+          f"{stats['schema_tokens_saved'] / stats['model_calls']:.0f} prompt tokens saved per call "
+          f"({stats['schema_tokens_saved'] / stats['model_calls'] / all_tokens:.0%})")
+    print(f"avg turn with a fake LLM ({FIRST_TOKEN * 1000:.0f} ms + {PREFILL_PER_TOKEN * 1e6:.0f} us/prompt token): "
+          f"{baseline * 1000:.0f} ms -> {selected * 1000:.0f} ms")
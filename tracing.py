@@ -0,0 +1,333 @@
+"""
+Opt-in tracing of graph steps, LLM calls, tool calls and checkpointer I/O.
+
+Set TRACE_DIR=<directory> to enable. Spans are collected by a LangChain
+callback handler (graph nodes, LLM calls, tool calls) and by a wrapper around
+the checkpointer (checkpoint get/put), each with wall and CPU time.
+Traces are written to TRACE_DIR as:
+    trace-<pid>-<n>.json    Chrome trace-event JSON (chrome://tracing, Perfetto)
+    trace-<pid>-<n>.folded  collapsed stacks for flamegraph.pl / speedscope
+Every export_traces() call writes the runs finished since the previous one
+to the next <n> and drops them from memory, so a long-running process (the
+Streamlit app exports after every turn) does not accumulate spans.
+
+When TRACE_DIR is unset, tracing_callbacks() returns no handler and
+traced_checkpointer() returns the checkpointer unchanged, so nothing runs.
+
+CPU time is process CPU time while the span was open; spans that overlap
+(concurrent tool calls, async graphs) each count the shared CPU time.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "category", "start", "end", "cpu_start", "cpu", "lane")
+
+    def __init__(self, span_id, parent, name, category, lane):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.category = category
+        self.lane = lane
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.end: Optional[float] = None
+        self.cpu = 0.0
+
+
+class Tracer:
+    """Collects nested spans and exports them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: Dict[Any, Span] = {}
+        # lane -> innermost open span drawn on it. A span shares its parent's
+        # lane unless a sibling already sits there (concurrent tool calls)
+        self._lane_top: Dict[int, Any] = {}
+        # Root run of the graph executing in the current task/thread; checkpoint
+        # I/O happens in the graph loop, outside any node, and hangs off it
+        self._current_root: contextvars.ContextVar = contextvars.ContextVar("trace_root", default=None)
+        self._origin = time.perf_counter()
+        self._exports = 0
+
+    def _lane_for(self, parent: Optional[Span]) -> int:
+        if parent is not None and self._lane_top.get(parent.lane) == parent.id:
+            return parent.lane
+        lane = 0
+        while lane in self._lane_top:
+            lane += 1
+        return lane
+
+    def start(self, span_id, name: str, category: str, parent_id=None) -> Span:
+        with self._lock:
+            parent = self.spans.get(parent_id)
+            if parent is None and category == "checkpoint":
+                root = self.spans.get(self._current_root.get())
+                parent = root if root is not None and root.end is None else None
+            lane = self._lane_for(parent)
+            self._lane_top[lane] = span_id
+            span = Span(span_id, parent.id if parent else None, name, category, lane)
+            self.spans[span_id] = span
+            if parent is None and category != "checkpoint":
+                # Copied into the tasks the graph loop starts from here on
+                self._current_root.set(span_id)
+            return span
+
+    def end(self, span_id):
+        with self._lock:
+            span = self.spans.get(span_id)
+            if span is None or span.end is not None:
+                return
+            span.end = time.perf_counter()
+            span.cpu = time.process_time() - span.cpu_start
+            if self._lane_top.get(span.lane) == span_id:
+                parent = self.spans.get(span.parent)
+                if parent is not None and parent.lane == span.lane and parent.end is None:
+                    self._lane_top[span.lane] = parent.id
+                else:
+                    del self._lane_top[span.lane]
+
+    def _closed(self) -> List[Span]:
+        with self._lock:
+            return [s for s in self.spans.values() if s.end is not None]
+
+    def drain(self) -> List[Span]:
+        """Remove and return the spans of finished root runs, children included"""
+        with self._lock:
+            def root_of(span):
+                while span.parent in self.spans:
+                    span = self.spans[span.parent]
+                return span
+
+            done = [s for s in self.spans.values() if s.end is not None and root_of(s).end is not None]
+            for span in done:
+                del self.spans[span.id]
+            return done
+
+    def chrome_trace(self, spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+        events = []
+        for span in self._closed() if spans is None else spans:
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - self._origin) * 1e6,
+                "dur": (span.end - span.start) * 1e6,
+                "pid": os.getpid(),
+                "tid": span.lane,
+                "args": {"cpu_ms": round(span.cpu * 1000, 3)},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def collapsed_stacks(self, spans: Optional[List[Span]] = None) -> List[str]:
+        """flamegraph.pl input: one 'root;child;leaf <self wall time in us>' line per stack"""
+        spans = {s.id: s for s in (self._closed() if spans is None else spans)}
+        child_time: Dict[Any, float] = {}
+        for span in spans.values():
+            if span.parent in spans:
+                child_time[span.parent] = child_time.get(span.parent, 0.0) + span.end - span.start
+
+        totals: Dict[str, int] = {}
+        for span in spans.values():
+            path, node = [], span
+            while node is not None:
+                path.append(node.name.replace(";", ":").replace(" ", "_"))
+                node = spans.get(node.parent)
+            own = (span.end - span.start) - child_time.get(span.id, 0.0)
+            key = ";".join(reversed(path))
+            totals[key] = totals.get(key, 0) + max(0, int(own * 1e6))
+        return [f"{stack} {value}" for stack, value in sorted(totals.items()) if value]
+
+    def export(self, directory: str):
+        """Write the finished runs to the next trace-<pid>-<n> files and forget them"""
+        spans = self.drain()
+        if not spans:
+            return
+        with self._lock:
+            self._exports += 1
+            number = self._exports
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"trace-{os.getpid()}-{number}")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(spans), f)
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed_stacks(spans)) + "\n")
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Opens a span per graph node, LLM call and tool call"""
+
+    # Run in the caller's thread/loop, so span timestamps are taken when the event happens
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        # Hidden runs (channel writes, routing) get no span; their children hang off the parent
+        self._alias: Dict[Any, Any] = {}
+
+    def _parent(self, parent_run_id):
+        return self._alias.get(parent_run_id, parent_run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        if tags and "langsmith:hidden" in tags:
+            self._alias[run_id] = self._parent(parent_run_id)
+            return
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        self.tracer.start(run_id, name, "graph", self._parent(parent_run_id))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if self._alias.pop(run_id, None) is None:
+            self.tracer.end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+    def _llm_start(self, serialized, run_id, parent_run_id, kwargs):
+        invocation = kwargs.get("invocation_params") or {}
+        model = invocation.get("model") or invocation.get("model_name") or kwargs.get("name") or "model"
+        self.tracer.start(run_id, f"llm:{model}", "llm", self._parent(parent_run_id))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._llm_start(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._llm_start(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.tracer.end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.tracer.end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self.tracer.start(run_id, f"tool:{name}", "tool", self._parent(parent_run_id))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self.tracer.end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self.tracer.end(run_id)
+
+
+class TracedCheckpointer(BaseCheckpointSaver):
+    """Checkpointer wrapper that records a span around every get/put"""
+
+    def __init__(self, saver: BaseCheckpointSaver, tracer: Tracer):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.tracer = tracer
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    def _span(self, name: str):
+        span_id = uuid.uuid4()
+        self.tracer.start(span_id, f"checkpoint:{name}", "checkpoint")
+        return span_id
+
+    def get_tuple(self, config):
+        span = self._span("get")
+        try:
+            return self.saver.get_tuple(config)
+        finally:
+            self.tracer.end(span)
+
+    def list(self, config, **kwargs) -> Iterator:
+        span = self._span("list")
+        try:
+            return iter(list(self.saver.list(config, **kwargs)))
+        finally:
+            self.tracer.end(span)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        span = self._span("put")
+        try:
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+        finally:
+            self.tracer.end(span)
+
+    def put_writes(self, config, writes: Sequence, task_id: str, task_path: str = ""):
+        span = self._span("put_writes")
+        try:
+            return self.saver.put_writes(config, writes, task_id, task_path)
+        finally:
+            self.tracer.end(span)
+
+    def delete_thread(self, thread_id: str):
+        return self.saver.delete_thread(thread_id)
+
+    async def aget_tuple(self, config):
+        span = self._span("get")
+        try:
+            return await self.saver.aget_tuple(config)
+        finally:
+            self.tracer.end(span)
+
+    async def alist(self, config, **kwargs):
+        span = self._span("list")
+        try:
+            items = [item async for item in self.saver.alist(config, **kwargs)]
+        finally:
+            self.tracer.end(span)
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        span = self._span("put")
+        try:
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+        finally:
+            self.tracer.end(span)
+
+    async def aput_writes(self, config, writes: Sequence, task_id: str, task_path: str = ""):
+        span = self._span("put_writes")
+        try:
+            return await self.saver.aput_writes(config, writes, task_id, task_path)
+        finally:
+            self.tracer.end(span)
+
+    async def adelete_thread(self, thread_id: str):
+        return await self.saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+
+# TRACE_DIR is read at import time, before the scripts call load_dotenv()
+load_dotenv()
+TRACE_DIR = os.getenv("TRACE_DIR")
+tracer: Optional[Tracer] = Tracer() if TRACE_DIR else None
+_handler = TracingCallbackHandler(tracer) if tracer else None
+
+
+def tracing_callbacks() -> List[BaseCallbackHandler]:
+    """[TracingCallbackHandler] when TRACE_DIR is set, otherwise an empty list"""
+    return [_handler] if _handler else []
+
+
+def traced_checkpointer(saver: BaseCheckpointSaver) -> BaseCheckpointSaver:
+    """Wrap `saver` when TRACE_DIR is set, otherwise return it as is"""
+    return TracedCheckpointer(saver, tracer) if tracer else saver
+
+
+def export_traces():
+    """Write the runs finished since the last export to TRACE_DIR (no-op when disabled)"""
+    if tracer:
+        tracer.export(TRACE_DIR)
+
+
+atexit.register(export_traces)